@@ -0,0 +1,59 @@
+"""Add reminder_due_date and composite indexes for reminder and upcoming scans
+
+Revision ID: 3b8e1f6a2c7d
+Revises: 9c457e853f0a
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1f6a2c7d'
+down_revision: Union[str, Sequence[str], None] = '9c457e853f0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add subscriptions.reminder_due_date, backfill it, and index reminder/upcoming lookups."""
+    op.add_column('subscriptions', sa.Column('reminder_due_date', sa.Date(), nullable=True))
+
+    # Backfill: reminder_due_date = next_billing_date - reminder_days_before days
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "UPDATE subscriptions "
+            "SET reminder_due_date = date(next_billing_date, '-' || reminder_days_before || ' days') "
+            "WHERE next_billing_date IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE subscriptions "
+            "SET reminder_due_date = next_billing_date - reminder_days_before "
+            "WHERE next_billing_date IS NOT NULL"
+        )
+
+    op.create_index(
+        'ix_subscriptions_reminder_due',
+        'subscriptions',
+        ['is_active', 'reminder_enabled', 'reminder_due_date', 'next_billing_date'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_subscriptions_user_id_next_billing_date',
+        'subscriptions',
+        ['user_id', 'next_billing_date'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Drop the reminder/upcoming indexes and reminder_due_date."""
+    op.drop_index('ix_subscriptions_user_id_next_billing_date', table_name='subscriptions')
+    op.drop_index('ix_subscriptions_reminder_due', table_name='subscriptions')
+    with op.batch_alter_table('subscriptions') as batch_op:
+        batch_op.drop_column('reminder_due_date')
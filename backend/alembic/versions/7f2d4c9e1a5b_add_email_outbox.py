@@ -0,0 +1,56 @@
+"""Add email_outbox table for queued reminder delivery
+
+Revision ID: 7f2d4c9e1a5b
+Revises: 3b8e1f6a2c7d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2d4c9e1a5b'
+down_revision: Union[str, Sequence[str], None] = '3b8e1f6a2c7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create email_outbox table."""
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('dedupe_key', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('subscription_id', sa.Integer(), nullable=True),
+        sa.Column('to_email', sa.String(), nullable=False),
+        sa.Column('subject', sa.Text(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('claim_token', sa.String(length=36), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dedupe_key'),
+    )
+    op.create_index(op.f('ix_email_outbox_id'), 'email_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_email_outbox_claim_token'), 'email_outbox', ['claim_token'], unique=False)
+    op.create_index(
+        'ix_email_outbox_status_available_at', 'email_outbox', ['status', 'available_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Drop email_outbox table."""
+    op.drop_index('ix_email_outbox_status_available_at', table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_claim_token'), table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_id'), table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,34 @@
+"""Add job_leases table for sharded reminder runs
+
+Revision ID: a4c61d0e9b32
+Revises: 7f2d4c9e1a5b
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c61d0e9b32'
+down_revision: Union[str, Sequence[str], None] = '7f2d4c9e1a5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create job_leases table."""
+    op.create_table(
+        'job_leases',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('owner', sa.String(length=255), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Drop job_leases table."""
+    op.drop_table('job_leases')
@@ -0,0 +1,47 @@
+"""Add user_spending_rollup table
+
+Revision ID: d5e83b7a4f10
+Revises: a4c61d0e9b32
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e83b7a4f10'
+down_revision: Union[str, Sequence[str], None] = 'a4c61d0e9b32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create user_spending_rollup and backfill it from active subscriptions."""
+    op.create_table(
+        'user_spending_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('billing_cycle', sa.String(length=20), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('currency', sa.String(length=10), nullable=False),
+        sa.Column('subscription_count', sa.Integer(), nullable=False),
+        sa.Column('total_price', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'billing_cycle', 'category', 'currency')
+    )
+
+    op.execute(
+        "INSERT INTO user_spending_rollup "
+        "(user_id, billing_cycle, category, currency, subscription_count, total_price) "
+        "SELECT user_id, lower(billing_cycle), coalesce(category, ''), currency, count(id), sum(price) "
+        "FROM subscriptions "
+        "WHERE is_active = true "
+        "GROUP BY user_id, lower(billing_cycle), coalesce(category, ''), currency"
+    )
+
+
+def downgrade() -> None:
+    """Drop user_spending_rollup table."""
+    op.drop_table('user_spending_rollup')
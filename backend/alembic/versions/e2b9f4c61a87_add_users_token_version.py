@@ -0,0 +1,29 @@
+"""Add users.token_version for access token revocation
+
+Revision ID: e2b9f4c61a87
+Revises: d5e83b7a4f10
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9f4c61a87'
+down_revision: Union[str, Sequence[str], None] = 'd5e83b7a4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add users.token_version."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Drop users.token_version."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,29 @@
+"""Add users.data_revision for conditional (ETag) reads
+
+Revision ID: f7c3a9d2e514
+Revises: e2b9f4c61a87
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3a9d2e514'
+down_revision: Union[str, Sequence[str], None] = 'e2b9f4c61a87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add users.data_revision."""
+    op.add_column('users', sa.Column('data_revision', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Drop users.data_revision."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_revision')
@@ -1,17 +1,22 @@
+import logging
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 
-from app.core.auth import get_current_user, get_user_by_email
+from app.core.auth import get_current_user, get_user_by_email, token_claims_for_user, update_password_hash
 from app.core.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    PasswordHashingBusy,
     create_access_token,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
 )
-from app.db.dependencies import get_db
+from app.db.dependencies import get_async_db
+from app.db.session import get_async_sessionmaker
 from app.models import User
 from app.schemas import UserCreate, UserRead
 
@@ -21,23 +26,20 @@ class LoginRequest(BaseModel):
     password: str
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(
-    user_in: UserCreate,
-    db: Session = Depends(get_db),
-):
-    existing = get_user_by_email(db, user_in.email)
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email is already registered",
-        )
+def _password_hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
-    hashed = hash_password(user_in.password)
 
+def _create_user(db: Session, user_in: UserCreate, hashed: str) -> User:
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
@@ -54,23 +56,72 @@ def register_user(
     return user
 
 
+async def _rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Background task after a successful login: rehash with the current
+    BCRYPT_ROUNDS and store it. Skipped when the hashing pool is busy; the
+    next login tries again.
+    """
+    try:
+        new_hash = await hash_password_async(password)
+        async with get_async_sessionmaker()() as db:
+            if await db.run_sync(update_password_hash, user_id, old_hash, new_hash):
+                logger.info(f"Rehashed password for user_id={user_id} at the current bcrypt cost")
+    except PasswordHashingBusy:
+        logger.info(f"Password hashing pool busy, deferring rehash for user_id={user_id}")
+    except Exception as e:
+        logger.error(f"Error rehashing password for user_id={user_id}: {str(e)}")
+
+
+# bcrypt runs on the dedicated password hashing pool (see app.core.security)
+@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+async def register_user(
+    user_in: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    existing = await db.run_sync(get_user_by_email, user_in.email)
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email is already registered",
+        )
+
+    try:
+        hashed = await hash_password_async(user_in.password)
+    except PasswordHashingBusy:
+        raise _password_hashing_busy()
+
+    return await db.run_sync(_create_user, user_in, hashed)
+
+
 @router.post("/login")
-def login_for_access_token(
+async def login_for_access_token(
     login_data: LoginRequest,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = get_user_by_email(db, login_data.email)
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = await db.run_sync(get_user_by_email, login_data.email)
+    try:
+        valid = user is not None and await verify_password_async(login_data.password, user.hashed_password)
+    except PasswordHashingBusy:
+        raise _password_hashing_busy()
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if password_needs_rehash(user.hashed_password):
+        # Cost changed since this hash was stored: upgrade it after responding
+        background_tasks.add_task(_rehash_password, user.id, user.hashed_password, login_data.password)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         subject=user.email,
         expires_delta=access_token_expires,
+        extra_claims=token_claims_for_user(user),
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -9,8 +9,16 @@ from typing import Optional
 from fastapi import APIRouter, Header, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 
-from app.services.reminders import process_renewal_reminders
+from app.core.auth import revoke_user_tokens
+from app.core.cache import get_response_cache
+from app.core.principal import get_principal_cache
+from app.core.security import get_password_hash_pool
+from app.db.dependencies import get_db
+from app.db.session import get_pool_stats
+from app.models import User
+from app.services.reminders import enqueue_reminder_shard
 
 logger = logging.getLogger(__name__)
 
@@ -68,16 +76,30 @@ class ReminderResponse(BaseModel):
 @router.post("/run-reminders", response_model=ReminderResponse)
 def run_reminders(
     within_days: int = 7,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    db: Session = Depends(get_db),
     _: bool = Depends(verify_internal_api_key),
 ):
     """
-    Process and send renewal reminders.
+    Queue today's renewal reminders for delivery.
+    
+    Reminders are bulk-inserted into the email outbox and delivered by the
+    outbox worker (`python -m app.services.outbox`), so this returns as
+    soon as they are queued. `reminders_sent` counts reminders queued.
     
     Protected by X-Internal-API-Key header.
     Idempotent: Won't send duplicate reminders within 24 hours.
     
+    Sharding: N cron jobs calling with shard_index=0..N-1 and shard_count=N
+    each take a disjoint slice of users (user_id % shard_count). A lease
+    ensures only one caller processes a given shard at a time; a
+    concurrent call for a shard already in progress gets 409.
+    
     Args:
         within_days: Look for subscriptions renewing within this many days (default: 7, max: 60)
+        shard_index: Which shard to process (0 <= shard_index < shard_count)
+        shard_count: Total number of shards (default: 1, no sharding)
     
     Returns:
         Statistics about reminders processed
@@ -88,35 +110,98 @@ def run_reminders(
     if within_days > 60:
         within_days = 60
     
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="shard_index must satisfy 0 <= shard_index < shard_count"
+        )
+    
     try:
-        logger.info(f"Starting reminder processing (within_days={within_days})")
-        
-        # Process reminders (this may take a few seconds, but is optimized)
-        stats = process_renewal_reminders(within_days=within_days)
-        
-        success = stats['errors'] == 0
-        message = (
-            f"Processed {stats['total_processed']} subscriptions. "
-            f"Sent {stats['reminders_sent']} reminders, "
-            f"skipped {stats['reminders_skipped']}, "
-            f"encountered {stats['errors']} errors."
+        logger.info(
+            f"Starting reminder processing (within_days={within_days}, "
+            f"shard={shard_index}/{shard_count})"
         )
         
-        logger.info(f"Reminder processing completed: {message}")
-        
-        return ReminderResponse(
-            success=success,
-            reminders_sent=stats['reminders_sent'],
-            reminders_skipped=stats['reminders_skipped'],
-            errors=stats['errors'],
-            total_processed=stats['total_processed'],
-            message=message
+        # Enqueue reminders; delivery happens in the outbox worker
+        stats = enqueue_reminder_shard(
+            db, within_days, shard_index=shard_index, shard_count=shard_count
         )
-        
     except Exception as e:
         logger.error(f"Error in run_reminders endpoint: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process reminders: {str(e)}"
         )
+    
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Reminder shard {shard_index}/{shard_count} is already being processed"
+        )
+    
+    success = stats['errors'] == 0
+    message = (
+        f"Processed {stats['total_processed']} subscriptions. "
+        f"Queued {stats['reminders_sent']} reminders, "
+        f"skipped {stats['reminders_skipped']}, "
+        f"encountered {stats['errors']} errors."
+    )
+    
+    logger.info(f"Reminder processing completed: {message}")
+    
+    return ReminderResponse(
+        success=success,
+        reminders_sent=stats['reminders_sent'],
+        reminders_skipped=stats['reminders_skipped'],
+        errors=stats['errors'],
+        total_processed=stats['total_processed'],
+        message=message
+    )
+
+
+@router.get("/stats")
+def get_internal_stats(_: bool = Depends(verify_internal_api_key)):
+    """
+    In-process runtime statistics: password hashing pool queue depth,
+    rejections and latency, principal and response cache hit rates, and
+    database connection pool usage and checkout wait times.
+
+    Protected by X-Internal-API-Key header.
+    """
+    return {
+        "password_hashing": get_password_hash_pool().stats(),
+        "principal_cache": get_principal_cache().stats(),
+        "response_cache": get_response_cache().stats(),
+        "db_pool": get_pool_stats(),
+    }
+
 
+class RevokeTokensResponse(BaseModel):
+    """Response model for token revocation."""
+    user_id: int
+    is_active: bool
+    token_version: int
+
+
+@router.post("/users/{user_id}/revoke-tokens", response_model=RevokeTokensResponse)
+def revoke_tokens(
+    user_id: int,
+    deactivate: bool = False,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_internal_api_key),
+):
+    """
+    Sign a user out everywhere: every access token issued so far is
+    rejected from the next request on. With deactivate=true the account
+    is also disabled, so tokens issued after this are rejected too.
+
+    Protected by X-Internal-API-Key header.
+    """
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if deactivate:
+        user.is_active = False
+    revoke_user_tokens(db, user)
+    logger.info(f"Revoked tokens for user_id={user.id} (deactivated={deactivate})")
+    return RevokeTokensResponse(user_id=user.id, is_active=user.is_active, token_version=user.token_version)
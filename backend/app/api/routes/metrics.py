@@ -0,0 +1,20 @@
+"""
+Prometheus metrics endpoint.
+Protected by INTERNAL_API_KEY (X-Internal-API-Key header), like /internal.
+"""
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.routes.internal import verify_internal_api_key
+from app.core.metrics import REGISTRY
+
+router = APIRouter(tags=["internal"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(_: bool = Depends(verify_internal_api_key)):
+    """
+    Request, database and reminder metrics of this process in the
+    Prometheus text exposition format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,123 +1,453 @@
-from typing import List
+import hashlib
+import json
+from datetime import date
+from typing import Awaitable, Callable, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.auth import get_current_user
-from app.db.dependencies import get_db
-from app.models import Subscription, User
-from app.schemas import SubscriptionCreate, SubscriptionRead, SubscriptionUpdate
+from app.core.auth import get_current_principal
+from app.core.cache import get_response_cache
+from app.core.principal import Principal
+from app.core.serialization import FAST_JSON_RESPONSES, dump_rows_json, rows_to_dicts
+from app.db.dependencies import get_async_db
+from app.schemas import (
+    SubscriptionBulkDelete,
+    SubscriptionBulkResult,
+    SubscriptionBulkUpdate,
+    SubscriptionCreate,
+    SubscriptionRead,
+    SubscriptionUpdate,
+)
+from app.services.export import EXPORT_FORMATS, stream_subscriptions_export
+from app.services.forecast import MAX_FORECAST_MONTHS, get_forecast_for_user
+from app.services.revisions import get_data_revision
 from app.services.subscriptions import (
+    BREAKDOWN_DIMENSIONS,
+    BULK_MAX_ROWS,
+    LIST_FIELDS,
+    bulk_create_subscriptions,
+    bulk_delete_subscriptions,
+    bulk_update_subscriptions,
     create_subscription,
     delete_subscription,
+    get_breakdown_for_user,
     get_subscription,
-    get_subscriptions_for_user,
+    get_summary_for_user,
     get_upcoming_renewals,
+    list_subscriptions_page,
+    parse_bulk_csv,
     update_subscription,
+    validate_bulk_rows,
 )
 
 router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
 
+_SUBSCRIPTION_LIST = TypeAdapter(List[SubscriptionRead])
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110): any listed tag, or *."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def _revalidate(
+    request: Request, db: AsyncSession, user_id: int, *variant: str
+) -> Tuple[Optional[int], dict, bool]:
+    """
+    Build the ETag of a read endpoint and check it against If-None-Match.
+
+    The tag combines the user's data revision (bumped by every write, see
+    app.services.revisions) with a digest of the path, query string and
+    `variant` (e.g. today's date for date-relative results). It is read
+    before the data, so a concurrent write can only make the tag older
+    than the body, never newer.
+
+    Returns (the revision, headers for the response, whether to answer 304).
+    """
+    revision = await db.run_sync(get_data_revision, user_id)
+    key = "|".join([
+        str(user_id),
+        request.url.path,
+        str(sorted(request.query_params.multi_items())),
+        *variant,
+    ])
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    etag = f'"{revision}-{digest}"'
+    # Cacheable by the browser only, and always revalidated
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    return revision, headers, _etag_matches(request.headers.get("if-none-match"), etag)
+
+
+def _json_bytes(content) -> bytes:
+    """Encode JSON-compatible content the way JSONResponse renders it."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _subscriptions_json(subscriptions) -> bytes:
+    """Serialize ORM subscriptions as a SubscriptionRead list (what response_model would send)."""
+    return _SUBSCRIPTION_LIST.dump_json(_SUBSCRIPTION_LIST.validate_python(subscriptions, from_attributes=True))
+
+
+async def _cached_read(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    load: Callable[[], Awaitable[Tuple[bytes, dict]]],
+    *variant: str,
+) -> Response:
+    """
+    Serve a per-user JSON read from the response cache (app.core.cache),
+    revalidating it against If-None-Match.
+
+    The user's data revision is read from the database first, so a 304 or
+    a cache hit is never older than the last committed write, whichever
+    process or replica made it. Otherwise `load()` runs, returning (JSON
+    body, extra headers) to send and cache under that revision.
+    """
+    revision, headers, not_modified = await _revalidate(request, db, user_id, *variant)
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_response_cache()
+    key = cache.make_key(
+        user_id, revision, request.url.path, [sorted(request.query_params.multi_items()), *variant]
+    )
+    entry = await cache.get(key)
+    if entry is not None:
+        cached_headers, body = entry
+        headers.update(cached_headers)
+    else:
+        body, extra_headers = await load()
+        headers.update(extra_headers)
+        await cache.set(key, headers, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @router.get("", response_model=List[SubscriptionRead])
-def list_subscriptions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_subscriptions(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    fields: Optional[str] = None,
+    category: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    billing_cycle: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    """Get all subscriptions for the current user."""
-    subscriptions = get_subscriptions_for_user(db, current_user.id)
-    return subscriptions
+    """
+    Get the current user's subscriptions.
+
+    Without `limit` or `cursor` all subscriptions are returned. With them,
+    one page of at most `limit` rows is returned, and the cursor for the
+    next page is sent in the `X-Next-Cursor` header (absent on the last page).
+
+    - `sort`: id, -id, next_billing_date or -next_billing_date
+    - `fields`: comma-separated columns to return, e.g. `fields=id,name,price`
+    - `category`, `is_active`, `billing_cycle`: filters
+
+    Responses are cached per user and carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    field_list = None
+    if fields is not None:
+        field_list = [field.strip() for field in fields.split(",") if field.strip()]
+
+    async def load() -> Tuple[bytes, dict]:
+        try:
+            rows, next_cursor = await db.run_sync(
+                list_subscriptions_page,
+                current_user.id,
+                limit=limit,
+                cursor=cursor,
+                sort=sort,
+                fields=field_list,
+                category=category,
+                is_active=is_active,
+                billing_cycle=billing_cycle,
+                as_tuples=FAST_JSON_RESPONSES,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        if FAST_JSON_RESPONSES:
+            if field_list is None:
+                rows = rows_to_dicts(LIST_FIELDS, rows)
+            return dump_rows_json(rows), headers
+        if field_list is not None:
+            # Projected rows are partial, so they bypass SubscriptionRead validation
+            return _json_bytes(jsonable_encoder(rows)), headers
+        return _subscriptions_json(rows), headers
+
+    return await _cached_read(request, db, current_user.id, load)
 
 
 @router.get("/upcoming", response_model=List[SubscriptionRead])
-def get_upcoming_subscriptions(
+async def get_upcoming_subscriptions(
+    request: Request,
     within_days: int = 7,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Return upcoming renewals for the current user within the next `within_days` days.
     Only includes active subscriptions with `reminder_enabled = True`.
+    Cached and revalidated like the list endpoint.
     """
     # Cap within_days to a reasonable maximum (60 days)
     if within_days > 60:
         within_days = 60
     if within_days < 1:
         within_days = 1
-    
-    subscriptions = get_upcoming_renewals(db, current_user.id, within_days=within_days)
-    return subscriptions
+
+    async def load() -> Tuple[bytes, dict]:
+        if FAST_JSON_RESPONSES:
+            rows = await db.run_sync(
+                get_upcoming_renewals, current_user.id, within_days=within_days, as_tuples=True
+            )
+            return dump_rows_json(rows_to_dicts(LIST_FIELDS, rows)), {}
+        subscriptions = await db.run_sync(get_upcoming_renewals, current_user.id, within_days=within_days)
+        return _subscriptions_json(subscriptions), {}
+
+    # The window moves with the date even when the data doesn't
+    return await _cached_read(request, db, current_user.id, load, date.today().isoformat())
 
 
 @router.get("/summary")
-def get_subscriptions_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_subscriptions_summary(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    """Get summary statistics for the current user's subscriptions."""
-    subscriptions = db.query(Subscription).filter(
-        Subscription.user_id == current_user.id, Subscription.is_active == True
-    ).all()
-
-    total_active = len(subscriptions)
-    total_monthly_cost = 0.0
-    by_billing_cycle = {"monthly": 0.0, "yearly": 0.0, "weekly": 0.0}
-
-    for sub in subscriptions:
-        price = float(sub.price)
-        cycle = sub.billing_cycle.lower()
-
-        # Calculate monthly equivalent
-        if cycle == "monthly":
-            monthly_equivalent = price
-            by_billing_cycle["monthly"] += price
-        elif cycle == "yearly":
-            monthly_equivalent = price / 12
-            by_billing_cycle["yearly"] += price
-        elif cycle == "weekly":
-            monthly_equivalent = price * 4.345
-            by_billing_cycle["weekly"] += price
-        else:
-            # Default to monthly if unknown cycle
-            monthly_equivalent = price
-            by_billing_cycle["monthly"] += price
+    """
+    Get summary statistics for the current user's subscriptions.
+    Cached and revalidated like the list endpoint.
+    """
+    async def load() -> Tuple[bytes, dict]:
+        summary = await db.run_sync(get_summary_for_user, current_user.id)
+        return _json_bytes(summary), {}
 
-        total_monthly_cost += monthly_equivalent
+    return await _cached_read(request, db, current_user.id, load)
 
-    return {
-        "total_active": total_active,
-        "total_monthly_cost": round(total_monthly_cost, 2),
-        "by_billing_cycle": {
-            "monthly": round(by_billing_cycle["monthly"], 2),
-            "yearly": round(by_billing_cycle["yearly"], 2),
-            "weekly": round(by_billing_cycle["weekly"], 2),
-        },
-    }
+
+@router.get("/forecast")
+async def get_subscriptions_forecast(
+    months: int = 12,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Forecast the actual amount charged in each of the next `months` calendar
+    months (starting with the current one) for the current user's active
+    subscriptions.
+
+    Returns {"start_month": "YYYY-MM", "totals": [...]}, one total per month.
+    """
+    # Cap months to a reasonable range (1 to 10 years)
+    if months > MAX_FORECAST_MONTHS:
+        months = MAX_FORECAST_MONTHS
+    if months < 1:
+        months = 1
+
+    return await db.run_sync(get_forecast_for_user, current_user.id, months=months)
+
+
+@router.get("/breakdown")
+async def get_subscriptions_breakdown(
+    by: str = "category",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Monthly-normalized spending of the current user's active subscriptions,
+    grouped by `by` (category, currency or billing_cycle).
+
+    Returns a list of {"key", "count", "monthly_cost"}, largest first.
+    """
+    if by not in BREAKDOWN_DIMENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"by must be one of: {', '.join(BREAKDOWN_DIMENSIONS)}",
+        )
+
+    return await db.run_sync(get_breakdown_for_user, current_user.id, by=by)
+
+
+@router.get("/export")
+async def export_subscriptions(
+    format: str = "ndjson",
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Download all of the current user's subscriptions as NDJSON (one JSON
+    object per line) or CSV.
+
+    The body is streamed from a server-side cursor, so large exports start
+    immediately and use constant memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}",
+        )
+
+    return StreamingResponse(
+        stream_subscriptions_export(current_user.id, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="subscriptions.{format}"'},
+    )
 
 
 @router.post("", response_model=SubscriptionRead, status_code=status.HTTP_201_CREATED)
-def create_subscription_endpoint(
+async def create_subscription_endpoint(
     subscription_in: SubscriptionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Create a new subscription for the current user."""
     # If reminder_days_before is not provided (None), use the user's default
     if subscription_in.reminder_days_before is None:
         subscription_in.reminder_days_before = current_user.default_reminder_days_before
     
-    subscription = create_subscription(db, current_user.id, subscription_in)
+    subscription = await db.run_sync(create_subscription, current_user.id, subscription_in)
     return subscription
 
 
+@router.post("/bulk")
+async def bulk_create_subscriptions_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Create many subscriptions at once.
+
+    The body is either a JSON array of subscription objects or, with
+    `Content-Type: text/csv`, CSV with a header row of field names. Valid
+    rows are created in one transaction; invalid rows are reported by their
+    0-based index and skipped. Rows without `reminder_days_before` use the
+    user's default.
+
+    Returns {"created": int, "ids": [...], "errors": [{"index", "errors"}]}.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith(("text/csv", "application/csv")):
+            rows = parse_bulk_csv(body.decode("utf-8-sig"))
+        else:
+            rows = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or CSV"
+        )
+
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or CSV"
+        )
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per request",
+        )
+
+    # Validation is pure CPU work; keep it off the event loop
+    valid, errors = await run_in_threadpool(validate_bulk_rows, rows)
+    ids = await db.run_sync(
+        bulk_create_subscriptions,
+        current_user.id,
+        [subscription_in for _, subscription_in in valid],
+        current_user.default_reminder_days_before,
+    )
+    return {"created": len(ids), "ids": ids, "errors": errors}
+
+
+def _check_bulk_selection(selection: SubscriptionBulkDelete) -> None:
+    """Reject bulk requests that select nothing explicitly or too many ids."""
+    if selection.ids is None and selection.filter is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Provide ids, filter, or both"
+        )
+    # An empty filter would select every subscription the user owns
+    if selection.filter is not None and all(
+        value is None for value in selection.filter.model_dump().values()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="filter must set at least one field"
+        )
+    if selection.ids is not None and len(selection.ids) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} ids per request",
+        )
+
+
+@router.patch("/bulk", response_model=SubscriptionBulkResult)
+async def bulk_update_subscriptions_endpoint(
+    bulk_in: SubscriptionBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Apply the same partial update to the current user's subscriptions
+    selected by `ids` and/or `filter`. Returns the updated ids; ids that
+    don't exist or belong to another user are ignored.
+    """
+    _check_bulk_selection(bulk_in)
+    try:
+        ids = await db.run_sync(
+            bulk_update_subscriptions,
+            current_user.id,
+            bulk_in.update.model_dump(exclude_unset=True),
+            ids=bulk_in.ids,
+            filters=bulk_in.filter.model_dump() if bulk_in.filter else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"ids": ids}
+
+
+@router.delete("/bulk", response_model=SubscriptionBulkResult)
+async def bulk_delete_subscriptions_endpoint(
+    bulk_in: SubscriptionBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Delete the current user's subscriptions selected by `ids` and/or
+    `filter`. Returns the deleted ids; ids that don't exist or belong to
+    another user are ignored.
+    """
+    _check_bulk_selection(bulk_in)
+    ids = await db.run_sync(
+        bulk_delete_subscriptions,
+        current_user.id,
+        ids=bulk_in.ids,
+        filters=bulk_in.filter.model_dump() if bulk_in.filter else None,
+    )
+    return {"ids": ids}
+
+
 @router.get("/{subscription_id}", response_model=SubscriptionRead)
-def get_subscription_endpoint(
+async def get_subscription_endpoint(
     subscription_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Get a specific subscription by ID."""
-    subscription = get_subscription(db, current_user.id, subscription_id)
+    subscription = await db.run_sync(get_subscription, current_user.id, subscription_id)
     if subscription is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found"
@@ -126,34 +456,34 @@ def get_subscription_endpoint(
 
 
 @router.put("/{subscription_id}", response_model=SubscriptionRead)
-def update_subscription_endpoint(
+async def update_subscription_endpoint(
     subscription_id: int,
     subscription_in: SubscriptionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Update a subscription."""
-    subscription = get_subscription(db, current_user.id, subscription_id)
+    subscription = await db.run_sync(get_subscription, current_user.id, subscription_id, for_update=True)
     if subscription is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found"
         )
-    updated_subscription = update_subscription(db, subscription, subscription_in)
+    updated_subscription = await db.run_sync(update_subscription, subscription, subscription_in)
     return updated_subscription
 
 
 @router.delete("/{subscription_id}")
-def delete_subscription_endpoint(
+async def delete_subscription_endpoint(
     subscription_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Delete a subscription."""
-    subscription = get_subscription(db, current_user.id, subscription_id)
+    subscription = await db.run_sync(get_subscription, current_user.id, subscription_id, for_update=True)
     if subscription is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found"
         )
-    delete_subscription(db, subscription)
+    await db.run_sync(delete_subscription, subscription)
     return {"detail": "Subscription deleted"}
 
@@ -1,11 +1,14 @@
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import bearer_scheme, decode_access_token
-from app.db.dependencies import get_db
+from app.core.principal import Principal, get_principal_cache
+from app.core.security import bearer_scheme, decode_access_token_payload
+from app.db.dependencies import get_async_db
 from app.models import User
 
 
@@ -13,33 +16,120 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 
+def update_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Replace a user's password hash, unless it changed since `old_hash` was
+    read (e.g. a concurrent password change). Returns True if updated.
+    """
+    result = db.execute(
+        update(User)
+        .where(User.id == user_id, User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def get_principal_by_id(db: Session, user_id: int) -> Optional[Principal]:
+    """Load a Principal with a narrow column select on users."""
+    row = (
+        db.query(
+            User.id,
+            User.email,
+            User.is_active,
+            User.token_version,
+            User.default_reminder_days_before,
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
+    return Principal.from_user(row) if row is not None else None
+
+
+def token_claims_for_user(user) -> dict[str, Any]:
+    """Claims added to access tokens so requests can be authorized without a users lookup."""
+    return {"uid": user.id, "active": user.is_active, "ver": user.token_version or 0}
+
+
+def revoke_user_tokens(db: Session, user: User) -> None:
+    """Invalidate every access token issued to `user` so far."""
+    user.token_version = (user.token_version or 0) + 1
+    db.commit()
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_credentials(credentials: Optional[HTTPAuthorizationCredentials]) -> dict[str, Any]:
+    if credentials is None:
+        raise _unauthorized("Could not validate credentials")
+
+    payload = decode_access_token_payload(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        raise _unauthorized("Could not validate credentials")
+    return payload
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Authorize a request from its token, reading the users table only on a
+    principal cache miss (or for tokens issued before uid/ver claims).
+    """
+    payload = _decode_credentials(credentials)
+
+    # Tokens issued before the "ver" claim count as version 0, so revoking
+    # a user's tokens also revokes those
+    token_version = payload.get("ver", 0)
+
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Legacy token with only "sub": fall back to the email lookup
+        user = await db.run_sync(get_user_by_email, payload["sub"])
+        if user is None or not user.is_active:
+            raise _unauthorized("Inactive or non-existent user")
+        if (user.token_version or 0) != token_version:
+            raise _unauthorized("Token has been revoked")
+        return Principal.from_user(user)
+
+    if payload.get("active") is False:
+        raise _unauthorized("Inactive or non-existent user")
+
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is None or principal.token_version != token_version:
+        # Miss, or the entry predates a version bump made by another process
+        principal = await db.run_sync(get_principal_by_id, user_id)
+        if principal is not None:
+            cache.set(principal)
+
+    if principal is None or not principal.is_active or principal.email != payload["sub"]:
+        raise _unauthorized("Inactive or non-existent user")
+    if principal.token_version != token_version:
+        raise _unauthorized("Token has been revoked")
+
+    return principal
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
-    if credentials is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    """Authorize a request and load the full User row, for endpoints that need it."""
+    payload = _decode_credentials(credentials)
 
-    token = credentials.credentials
-    email = decode_access_token(token)
-    
-    if email is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user = get_user_by_email(db, email=email)
+    user = await db.run_sync(get_user_by_email, payload["sub"])
     if user is None or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Inactive or non-existent user",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _unauthorized("Inactive or non-existent user")
+    if payload.get("ver", 0) != (user.token_version or 0):
+        raise _unauthorized("Token has been revoked")
 
     return user
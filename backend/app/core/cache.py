@@ -0,0 +1,217 @@
+"""
+Response cache for per-user read endpoints.
+
+Entries are opaque bytes (a serialized response) stored in a backend:
+
+- "memory" (default): an in-process TTL + LRU map; each process has its own.
+- "redis": a Redis server shared by all replicas (REDIS_URL). Needs the
+  optional `redis` package.
+- "none": caching disabled.
+
+Nothing is ever invalidated explicitly: every key embeds the user's
+data_revision (app.services.revisions), which each write bumps in its own
+transaction. Readers read the revision from the database before the data,
+so once a write commits, every process on every replica looks up new keys;
+entries under the old revision are unreachable and the LRU / TTL reclaims
+them. A reader racing a write can only store its result under the old
+revision.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "memory", "redis" or "none"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+# Seconds an entry stays valid, and how many entries the memory backend keeps
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend:
+    """Storage interface; reads and writes run on the request path."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Thread-safe TTL + LRU map of bytes."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared backend on a Redis server. Entries are SET with an expiry, so
+    Redis handles TTL; evictions under memory pressure follow the server's
+    maxmemory-policy (allkeys-lru recommended) and are reported from INFO.
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "subtrack:cache:"):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from e
+
+        self.prefix = prefix
+        # Short timeouts: a slow cache must not be slower than the database
+        options = {"socket_timeout": 0.5, "socket_connect_timeout": 0.5}
+        self._client = redis.asyncio.Redis.from_url(url, **options)
+        self._sync_client = redis.Redis.from_url(url, **options)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self._client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            self._count('errors')
+            return None
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        try:
+            await self._client.set(self.prefix + key, value, px=int(ttl_seconds * 1000))
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+            self._count('errors')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {'backend': 'redis', 'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+        try:
+            info = self._sync_client.info("stats")
+            stats['evictions'] = info.get("evicted_keys", 0)
+            stats['expirations'] = info.get("expired_keys", 0)
+        except Exception as e:
+            stats['info_error'] = str(e)
+        return stats
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        self._sync_client.close()
+
+
+class ResponseCache:
+    """Per-user cache of serialized responses (headers + body) on a CacheBackend."""
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def make_key(user_id: int, revision: Optional[int], endpoint: str, params: Iterable[Any] = ()) -> str:
+        """
+        Key for one user's response to `endpoint` with `params` (query
+        items, plus anything else the response depends on) at data
+        `revision`. Read the revision before loading the data.
+        """
+        digest = hashlib.blake2b(repr(list(params)).encode(), digest_size=8).hexdigest()
+        return f"{user_id}:{revision}:{endpoint}:{digest}"
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, str], bytes]]:
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        header_line, _, body = value.partition(b"\n")
+        return json.loads(header_line), body
+
+    async def set(self, key: str, headers: Dict[str, str], body: bytes) -> None:
+        value = json.dumps(headers, separators=(",", ":")).encode() + b"\n" + body
+        await self.backend.set(key, value, self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                if RESPONSE_CACHE_BACKEND == "redis":
+                    backend = RedisCacheBackend()
+                elif RESPONSE_CACHE_BACKEND == "none":
+                    backend = CacheBackend()
+                else:
+                    backend = MemoryCacheBackend()
+                _response_cache = ResponseCache(backend)
+    return _response_cache
+
+
+async def close_response_cache() -> None:
+    global _response_cache
+    if _response_cache is not None:
+        await _response_cache.backend.close()
+        _response_cache = None
@@ -1,11 +1,401 @@
+import asyncio
 import os
 import smtplib
 import logging
+import threading
+import time
 from email.message import EmailMessage
-from typing import Optional
+from typing import List, Optional
+
+import aiosmtplib
 
 logger = logging.getLogger(__name__)
 
+# Delivery settings (send_email and send_email_async)
+EMAIL_SEND_TIMEOUT = float(os.getenv("EMAIL_SEND_TIMEOUT", "30"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "2"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "0.5"))
+
+
+def _smtp_settings() -> Optional[dict]:
+    """
+    Read SMTP settings from the environment, or None if SMTP_HOST is not set.
+    SMTP_USERNAME / SMTP_PASSWORD are optional: without them the session
+    skips login (e.g. a local aiosmtpd or relay).
+    """
+    smtp_host = os.getenv("SMTP_HOST")
+    if not smtp_host:
+        return None
+    return {
+        "host": smtp_host,
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "username": os.getenv("SMTP_USERNAME") or None,
+        "password": os.getenv("SMTP_PASSWORD") or None,
+    }
+
+
+def _build_message(email_from: str, to_email: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = email_from
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg
+
+
+def _print_unsent_email(email_from: str, to_email: str, subject: str, body: str) -> None:
+    """Dev mode: log/print an email instead of sending it."""
+    logger.warning(
+        "SMTP not configured. Email will be printed to console instead of sent.\n"
+        "Set SMTP_HOST (plus SMTP_USERNAME and SMTP_PASSWORD if the server needs login) to enable email sending."
+    )
+    print("=" * 60)
+    print("EMAIL (NOT SENT - SMTP not configured)")
+    print("=" * 60)
+    print(f"From: {email_from}")
+    print(f"To: {to_email}")
+    print(f"Subject: {subject}")
+    print("-" * 60)
+    print(body)
+    print("=" * 60)
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP sessions.
+
+    Sessions are opened lazily (connect, STARTTLS on port 587, login) and
+    reused for many messages. At most `max_connections` sessions exist at
+    once; callers beyond that block until one is released. A session the
+    server has dropped is replaced transparently on SMTPServerDisconnected;
+    a refused message (SMTPResponseException) leaves its session pooled.
+
+    Works against any SMTP server, including a local aiosmtpd or
+    `python -m smtpd -n -c DebuggingServer localhost:1025` stand-in
+    (leave username/password unset to skip login).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        *,
+        max_connections: int = 4,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+        self._idle: List[smtplib.SMTP] = []
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP session."""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            # Use TLS if port is 587
+            if self.port == 587:
+                server.starttls()
+            # Login if credentials are provided
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _checkin(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.append(server)
+                return
+        self._quit(server)
+
+    def send_message(self, msg: EmailMessage) -> None:
+        """Send a message on a pooled session, reconnecting once if the server hung up."""
+        with self._slots:
+            server: Optional[smtplib.SMTP] = self._checkout()
+            try:
+                try:
+                    server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Idle sessions get dropped by the server; retry on a fresh one
+                    server.close()
+                    server = None
+                    server = self._connect()
+                    server.send_message(msg)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server refused this message (sender, recipients, data);
+                # smtplib has reset the transaction, so the session is still good
+                # (unless the server closed it with a 421)
+                if server is not None and server.sock is not None:
+                    self._checkin(server)
+                elif server is not None:
+                    server.close()
+                raise
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # Disconnects and socket errors: the session is unusable, don't
+                # return it to the pool
+                if server is not None:
+                    server.close()
+                raise
+            except Exception:
+                if server is not None:
+                    self._checkin(server)
+                raise
+            self._checkin(server)
+
+    def close(self) -> None:
+        """Close all idle sessions; sessions in use are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for server in idle:
+            self._quit(server)
+
+
+# Global pool instance
+_smtp_pool: Optional[SMTPConnectionPool] = None
+_smtp_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> Optional[SMTPConnectionPool]:
+    """
+    Get or create the global SMTP pool (used by send_email) from
+    environment variables. Returns None if SMTP is not configured.
+
+    SMTP_POOL_SIZE caps the number of concurrent sessions (default: 4).
+    """
+    global _smtp_pool
+    settings = _smtp_settings()
+    if settings is None:
+        return None
+
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            _smtp_pool = SMTPConnectionPool(
+                **settings,
+                max_connections=int(os.getenv("SMTP_POOL_SIZE", "4")),
+                timeout=EMAIL_SEND_TIMEOUT,
+            )
+        return _smtp_pool
+
+
+def close_smtp_pool() -> None:
+    """Close the global SMTP pool (called on app shutdown)."""
+    global _smtp_pool
+    with _smtp_pool_lock:
+        if _smtp_pool:
+            _smtp_pool.close()
+            _smtp_pool = None
+
+
+class AsyncSMTPConnectionPool:
+    """
+    asyncio counterpart of SMTPConnectionPool built on aiosmtplib.
+
+    Sessions belong to the event loop that opened them, so a pool should be
+    created and closed within one loop, e.g. for the duration of a reminder
+    run:
+
+        async with AsyncSMTPConnectionPool.from_env(max_connections=20) as pool:
+            await send_email_async(..., pool=pool)
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        *,
+        max_connections: int = 4,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._closed = False
+
+    @classmethod
+    def from_env(cls, *, max_connections: Optional[int] = None) -> Optional["AsyncSMTPConnectionPool"]:
+        """Build a pool from the SMTP_* environment variables, or None if SMTP is not configured."""
+        settings = _smtp_settings()
+        if settings is None:
+            return None
+        if max_connections is None:
+            max_connections = int(os.getenv("SMTP_POOL_SIZE", "4"))
+        return cls(**settings, max_connections=max_connections)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open and authenticate a new SMTP session (STARTTLS on port 587)."""
+        server = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            timeout=self.timeout,
+            start_tls=self.port == 587,
+        )
+        await server.connect()
+        return server
+
+    @staticmethod
+    async def _quit(server: aiosmtplib.SMTP) -> None:
+        try:
+            await server.quit()
+        except Exception:
+            server.close()
+
+    async def send_message(self, msg: EmailMessage) -> None:
+        """Send a message on a pooled session, reconnecting once if the server hung up."""
+        async with self._slots:
+            server: Optional[aiosmtplib.SMTP] = self._idle.pop() if self._idle else None
+            try:
+                if server is None:
+                    server = await self._connect()
+                try:
+                    await server.send_message(msg)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Idle sessions get dropped by the server; retry on a fresh one
+                    server.close()
+                    server = None
+                    server = await self._connect()
+                    await server.send_message(msg)
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError, asyncio.CancelledError):
+                # Connection is unusable (or mid-command), don't return it to the pool
+                if server is not None:
+                    server.close()
+                raise
+            except Exception:
+                if server is not None:
+                    self._checkin(server)
+                raise
+            self._checkin(server)
+
+    def _checkin(self, server: aiosmtplib.SMTP) -> None:
+        if self._closed:
+            server.close()
+        else:
+            self._idle.append(server)
+
+    async def close(self) -> None:
+        """Close all idle sessions."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for server in idle:
+            await self._quit(server)
+
+    async def __aenter__(self) -> "AsyncSMTPConnectionPool":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Permanent (5xx) SMTP rejections are not worth retrying; everything else is."""
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return not 500 <= error.code < 600
+    if isinstance(error, smtplib.SMTPResponseException):
+        return not 500 <= error.smtp_code < 600
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return any(_is_retryable(refusal) for refusal in error.recipients)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(not 500 <= code < 600 for code, _ in error.recipients.values())
+    return True
+
+
+def _retry_delay(to_email: str, error: Exception, attempt: int, max_retries: int) -> Optional[float]:
+    """
+    Retry policy shared by send_email and send_email_async: seconds to wait
+    before the next attempt, or None to give up and raise `error`.
+    """
+    if attempt >= max_retries or not _is_retryable(error):
+        logger.error(f"Failed to send email to {to_email}: {str(error)}")
+        return None
+    delay = EMAIL_RETRY_BACKOFF * (2 ** attempt)
+    logger.warning(
+        f"Send to {to_email} failed (attempt {attempt + 1}/{max_retries + 1}): "
+        f"{str(error)}; retrying in {delay:.1f}s"
+    )
+    return delay
+
+
+async def send_email_async(
+    to_email: str,
+    subject: str,
+    body: str,
+    *,
+    from_email: Optional[str] = None,
+    pool: Optional[AsyncSMTPConnectionPool] = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+) -> None:
+    """
+    Send an email using an asyncio SMTP client.
+
+    Uses `pool` if given, otherwise a one-off session from the SMTP_*
+    environment variables. Each attempt is bounded by `timeout` seconds
+    (EMAIL_SEND_TIMEOUT); transient failures are retried up to
+    `max_retries` times (EMAIL_MAX_RETRIES) with exponential backoff
+    starting at EMAIL_RETRY_BACKOFF seconds.
+
+    Delivery failures are raised to the caller once retries are exhausted.
+    In dev mode (SMTP not configured) the email is printed instead.
+    """
+    email_from = from_email or os.getenv("EMAIL_FROM", "noreply@subtrack.app")
+    timeout = EMAIL_SEND_TIMEOUT if timeout is None else timeout
+    max_retries = EMAIL_MAX_RETRIES if max_retries is None else max_retries
+
+    owns_pool = pool is None
+    if owns_pool:
+        pool = AsyncSMTPConnectionPool.from_env(max_connections=1)
+        if pool is None:
+            _print_unsent_email(email_from, to_email, subject, body)
+            return
+
+    msg = _build_message(email_from, to_email, subject, body)
+    try:
+        for attempt in range(max_retries + 1):
+            try:
+                await asyncio.wait_for(pool.send_message(msg), timeout=timeout)
+                logger.info(f"Email sent successfully to {to_email}")
+                return
+            except Exception as e:
+                delay = _retry_delay(to_email, e, attempt, max_retries)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+    finally:
+        if owns_pool:
+            await pool.close()
+
 
 def send_email(
     to_email: str,
@@ -13,68 +403,42 @@ def send_email(
     body: str,
     *,
     from_email: Optional[str] = None,
+    max_retries: Optional[int] = None,
 ) -> None:
     """
-    Send an email using SMTP.
-    
+    Send an email using SMTP, blocking the calling thread.
+
     Reads SMTP configuration from environment variables:
       - SMTP_HOST
       - SMTP_PORT
-      - SMTP_USERNAME
-      - SMTP_PASSWORD
+      - SMTP_USERNAME / SMTP_PASSWORD (optional)
       - EMAIL_FROM (default from_email)
-    
+      - SMTP_POOL_SIZE (max concurrent SMTP sessions, default 4)
+      - EMAIL_SEND_TIMEOUT, EMAIL_MAX_RETRIES, EMAIL_RETRY_BACKOFF
+
+    Messages go over the global pool of already-authenticated sessions
+    (get_smtp_pool), so bursts reuse connections. SMTP commands time out
+    after EMAIL_SEND_TIMEOUT seconds, and failures are retried and raised
+    with the same policy as send_email_async.
+
     In dev mode, if SMTP is not configured, just log/print the email instead of failing.
     """
-    # Get SMTP configuration from environment
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = os.getenv("SMTP_PORT", "587")
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
     email_from = from_email or os.getenv("EMAIL_FROM", "noreply@subtrack.app")
-    
-    # If SMTP is not configured, just log/print the email (dev mode)
-    if not smtp_host or not smtp_username or not smtp_password:
-        logger.warning(
-            "SMTP not configured. Email will be printed to console instead of sent.\n"
-            "Set SMTP_HOST, SMTP_USERNAME, and SMTP_PASSWORD environment variables to enable email sending."
-        )
-        print("=" * 60)
-        print("EMAIL (NOT SENT - SMTP not configured)")
-        print("=" * 60)
-        print(f"From: {email_from}")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        print("-" * 60)
-        print(body)
-        print("=" * 60)
+    max_retries = EMAIL_MAX_RETRIES if max_retries is None else max_retries
+
+    pool = get_smtp_pool()
+    if pool is None:
+        _print_unsent_email(email_from, to_email, subject, body)
         return
-    
-    # Create email message
-    msg = EmailMessage()
-    msg["From"] = email_from
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.set_content(body)
-    
-    # Send email via SMTP
-    try:
-        smtp_port_int = int(smtp_port)
-        with smtplib.SMTP(smtp_host, smtp_port_int) as server:
-            # Use TLS if port is 587
-            if smtp_port_int == 587:
-                server.starttls()
-            # Login if credentials are provided
-            if smtp_username and smtp_password:
-                server.login(smtp_username, smtp_password)
-            # Send the email
-            server.send_message(msg)
+
+    msg = _build_message(email_from, to_email, subject, body)
+    for attempt in range(max_retries + 1):
+        try:
+            pool.send_message(msg)
             logger.info(f"Email sent successfully to {to_email}")
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {str(e)}")
-        # In dev mode, don't crash - just log the error
-        print(f"ERROR: Failed to send email: {str(e)}")
-        print("Email content:")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        print(f"Body: {body}")
+            return
+        except Exception as e:
+            delay = _retry_delay(to_email, e, attempt, max_retries)
+            if delay is None:
+                raise
+            time.sleep(delay)
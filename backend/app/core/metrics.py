@@ -0,0 +1,304 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A small registry of counters, gauges and histograms (with labels), plus:
+
+- MetricsMiddleware: request count, latency and in-flight requests per
+  route template, and the number and duration of SQL statements each
+  request ran.
+- SQLAlchemy engine hooks: count and time every statement, by operation.
+
+Everything is per process; scrape every worker (or run one per
+container). Served on GET /metrics (app.api.routes.metrics).
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative) + overflow, sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.",
+    ("method", "route"),
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served, by method.",
+    ("method",),
+))
+HTTP_REQUEST_DB_STATEMENTS = REGISTRY.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request, by route template.",
+    ("route",), buckets=COUNT_BUCKETS,
+))
+HTTP_REQUEST_DB_DURATION = REGISTRY.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per HTTP request, by route template.",
+    ("route",), buckets=DB_BUCKETS,
+))
+DB_STATEMENT_DURATION = REGISTRY.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by operation (SELECT, INSERT, ...).",
+    ("operation",), buckets=DB_BUCKETS,
+))
+DB_STATEMENT_ERRORS = REGISTRY.register(Counter(
+    "db_statement_errors_total", "SQL statements that raised, by operation.",
+    ("operation",),
+))
+REMINDER_RUNS = REGISTRY.register(Counter(
+    "reminder_runs_total", "Reminder enqueue runs (one per shard run).",
+))
+REMINDERS_SENT = REGISTRY.register(Counter(
+    "reminders_sent_total", "Renewal reminders queued for delivery.",
+))
+REMINDERS_SKIPPED = REGISTRY.register(Counter(
+    "reminders_skipped_total", "Subscriptions in the reminder window that were not reminded.",
+))
+REMINDER_ERRORS = REGISTRY.register(Counter(
+    "reminder_errors_total", "Reminders that failed to render.",
+))
+REMINDER_RUN_DURATION = REGISTRY.register(Histogram(
+    "reminder_run_duration_seconds", "Duration of reminder enqueue runs.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+))
+OUTBOX_EMAILS = REGISTRY.register(Counter(
+    "outbox_emails_total", "Outbox delivery attempts by result (sent, retried, failed).",
+    ("result",),
+))
+
+
+class RequestDbStats:
+    """SQL statements run while serving one request."""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request. The object is
+# shared (not copied) with threads and greenlets the request spawns, so
+# statements run through run_sync / run_in_threadpool are counted too.
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_STATEMENT_DURATION.observe(elapsed, operation=_operation(statement))
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+    DB_STATEMENT_ERRORS.inc(operation=_operation(exception_context.statement or ""))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request metrics.
+
+    Routes are labeled by their template (/subscriptions/{subscription_id}),
+    never the raw path, so label cardinality stays bounded; requests that
+    match no route are labeled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        db_stats = RequestDbStats()
+        token = _request_db_stats.set(db_stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec(method=method)
+            _request_db_stats.reset(token)
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route)
+            HTTP_REQUEST_DB_STATEMENTS.observe(db_stats.statements, route=route)
+            HTTP_REQUEST_DB_DURATION.observe(db_stats.seconds, route=route)
@@ -0,0 +1,105 @@
+"""
+Authenticated principal and its in-process cache.
+
+Access tokens carry the user id ("uid"), active flag ("active") and
+token version ("ver"), so most requests can be authorized from the token
+plus a cached Principal without reading the users table. The cache is a
+TTL + LRU map keyed by user id. Entries are dropped whenever a User row is
+updated or deleted through the ORM in this process; other processes pick
+up changes when their entry expires (PRINCIPAL_CACHE_TTL) or when a token
+carries a newer version than the cached one.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from app.models import User
+
+# Seconds a cached principal stays valid, and how many are kept
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The subset of a User that request handlers need."""
+
+    id: int
+    email: str
+    is_active: bool
+    token_version: int
+    default_reminder_days_before: int
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=user.is_active,
+            token_version=user.token_version or 0,
+            default_reminder_days_before=user.default_reminder_days_before,
+        )
+
+
+class PrincipalCache:
+    """Thread-safe TTL + LRU cache of principals by user id."""
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl_seconds: float = PRINCIPAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, principal: Principal) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_principal_cache = PrincipalCache()
+
+
+def get_principal_cache() -> PrincipalCache:
+    return _principal_cache
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target) -> None:
+    """Drop a user's cached principal when the row changes (deactivation, token version bump, ...)."""
+    _principal_cache.invalidate(target.id)
@@ -0,0 +1,175 @@
+"""
+Query guard: opt-in N+1 and slow-query detection for development and tests.
+
+With QUERY_GUARD=log or QUERY_GUARD=raise, every HTTP request is checked for:
+
+- more than QUERY_GUARD_MAX_STATEMENTS SQL statements;
+- lazy relationship loads (e.g. touching Subscription.user or
+  User.subscriptions on objects loaded without them), the usual source of
+  N+1 query patterns.
+
+"log" writes a warning per offending request; "raise" makes the offending
+statement raise QueryGuardError, so the request fails with a 500 and the
+traceback points at the code that issued it. Set it in test runs to catch
+regressions before they ship.
+
+Independently of the mode, statements slower than QUERY_GUARD_SLOW_MS are
+logged with their EXPLAIN plan (plain EXPLAIN: the statement is not run
+again).
+
+Off by default; install_query_guard() registers nothing unless enabled.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+logger = logging.getLogger(__name__)
+
+# "off", "log" or "raise"
+QUERY_GUARD = os.getenv("QUERY_GUARD", "off").lower()
+# Statements one request may run before it is reported
+QUERY_GUARD_MAX_STATEMENTS = int(os.getenv("QUERY_GUARD_MAX_STATEMENTS", "20"))
+# Statements slower than this (milliseconds) are logged with their EXPLAIN plan
+QUERY_GUARD_SLOW_MS = float(os.getenv("QUERY_GUARD_SLOW_MS", "100"))
+
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+class QueryGuardError(RuntimeError):
+    """Raised in QUERY_GUARD=raise mode when a request breaks a query budget."""
+
+
+class RequestQueries:
+    """Statements and lazy loads seen while serving one request."""
+
+    __slots__ = ("label", "statements", "lazy_loads")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements = 0
+        self.lazy_loads: Counter = Counter()
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("query_guard_request", default=None)
+
+
+def _violation(message: str) -> None:
+    if QUERY_GUARD == "raise":
+        raise QueryGuardError(message)
+
+
+def _on_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    request = _current_request.get()
+    if request is None:
+        return
+    # e.g. "Subscription.user"
+    attribute = str(orm_execute_state.loader_strategy_path[-1])
+    request.lazy_loads[attribute] += 1
+    _violation(
+        f"{request.label}: lazy load of {attribute}; "
+        f"load it up front (selectinload / joinedload) or select the columns needed"
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if conn.info.get("query_guard_explaining"):
+        return
+    request = _current_request.get()
+    if request is not None:
+        request.statements += 1
+        if request.statements > QUERY_GUARD_MAX_STATEMENTS:
+            _violation(
+                f"{request.label}: more than {QUERY_GUARD_MAX_STATEMENTS} SQL statements "
+                f"(QUERY_GUARD_MAX_STATEMENTS); next: {statement[:200]}"
+            )
+    conn.info.setdefault("query_guard_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if conn.info.get("query_guard_explaining"):
+        return
+    starts = conn.info.get("query_guard_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    if elapsed_ms <= QUERY_GUARD_SLOW_MS:
+        return
+
+    request = _current_request.get()
+    plan = "(not explained)"
+    if not executemany and statement.lstrip().split(None, 1)[0].upper() in _EXPLAINABLE:
+        plan = _explain(conn, statement, parameters)
+    logger.warning(
+        f"Slow query ({elapsed_ms:.1f} ms > {QUERY_GUARD_SLOW_MS:g} ms)"
+        f"{' in ' + request.label if request else ''}:\n{statement}\nPlan:\n{plan}"
+    )
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_guard_start"):
+        conn.info["query_guard_start"].pop()
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """EXPLAIN a statement on the connection that just ran it."""
+    prefix = "EXPLAIN QUERY PLAN" if conn.dialect.name == "sqlite" else "EXPLAIN"
+    conn.info["query_guard_explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(f"{prefix} {statement}", parameters).fetchall()
+    except Exception as e:
+        return f"(EXPLAIN failed: {str(e)})"
+    finally:
+        conn.info["query_guard_explaining"] = False
+    return "\n".join(f"    {row[-1] if conn.dialect.name == 'sqlite' else row[0]}" for row in rows)
+
+
+class QueryGuardMiddleware:
+    """ASGI middleware tracking the statements and lazy loads of each request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestQueries(f"{scope['method']} {scope['path']}")
+        token = _current_request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            # In raise mode the offending statement already failed the request
+            if request.statements > QUERY_GUARD_MAX_STATEMENTS or request.lazy_loads:
+                lazy = ", ".join(f"{attribute} x{count}" for attribute, count in request.lazy_loads.items())
+                logger.warning(
+                    f"{request.label} ran {request.statements} SQL statements "
+                    f"(limit {QUERY_GUARD_MAX_STATEMENTS}); lazy loads: {lazy or 'none'}"
+                )
+
+
+def install_query_guard(app) -> bool:
+    """Register the query guard hooks and middleware if QUERY_GUARD is log or raise."""
+    if QUERY_GUARD not in ("log", "raise"):
+        return False
+    event.listen(Session, "do_orm_execute", _on_orm_execute)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    app.add_middleware(QueryGuardMiddleware)
+    logger.warning(
+        f"Query guard enabled: mode={QUERY_GUARD}, max statements per request="
+        f"{QUERY_GUARD_MAX_STATEMENTS}, slow query budget={QUERY_GUARD_SLOW_MS:g} ms"
+    )
+    return True
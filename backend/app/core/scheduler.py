@@ -4,7 +4,6 @@ import time
 from datetime import datetime, timedelta, time as dt_time
 from typing import Optional
 
-from app.db.session import SessionLocal
 from app.services.reminders import process_renewal_reminders
 
 logger = logging.getLogger(__name__)
@@ -13,8 +12,16 @@ logger = logging.getLogger(__name__)
 class ReminderScheduler:
     """Scheduler for running daily renewal reminder jobs."""
     
-    def __init__(self, run_time: dt_time = dt_time(9, 0)):  # Default: 9:00 AM
+    def __init__(
+        self,
+        run_time: dt_time = dt_time(9, 0),  # Default: 9:00 AM
+        shard_index: int = 0,
+        shard_count: int = 1,
+    ):
         self.run_time = run_time
+        # Each scheduler instance processes one shard of users (see process_renewal_reminders)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
         self.running = False
         self.thread: Optional[threading.Thread] = None
     
@@ -48,15 +55,17 @@ class ReminderScheduler:
             # Run the reminder process
             logger.info("Running daily renewal reminder check...")
             try:
-                db = SessionLocal()
-                try:
-                    stats = process_renewal_reminders(db, within_days=7)
-                    logger.info(
-                        f"Reminder check completed: {stats['reminders_sent']} sent, "
-                        f"{stats['reminders_skipped']} skipped, {stats['errors']} errors"
-                    )
-                finally:
-                    db.close()
+                # Enqueues due reminders and delivers this shard's reminders in this process
+                stats = process_renewal_reminders(
+                    within_days=7,
+                    shard_index=self.shard_index,
+                    shard_count=self.shard_count,
+                )
+                logger.info(
+                    f"Reminder check completed: {stats['reminders_queued']} queued, "
+                    f"{stats['reminders_sent']} sent, "
+                    f"{stats['reminders_skipped']} skipped, {stats['errors']} errors"
+                )
             except Exception as e:
                 logger.error(f"Error running reminder check: {str(e)}", exc_info=True)
     
@@ -91,7 +100,13 @@ def get_scheduler() -> ReminderScheduler:
         import os
         run_hour = int(os.getenv("REMINDER_SCHEDULE_HOUR", "9"))
         run_minute = int(os.getenv("REMINDER_SCHEDULE_MINUTE", "0"))
-        _scheduler = ReminderScheduler(run_time=dt_time(run_hour, run_minute))
+        shard_index = int(os.getenv("REMINDER_SHARD_INDEX", "0"))
+        shard_count = int(os.getenv("REMINDER_SHARD_COUNT", "1"))
+        _scheduler = ReminderScheduler(
+            run_time=dt_time(run_hour, run_minute),
+            shard_index=shard_index,
+            shard_count=shard_count,
+        )
     return _scheduler
 
 
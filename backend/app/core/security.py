@@ -1,6 +1,13 @@
-from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+import asyncio
+import logging
 import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -20,7 +27,18 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work factor (log2 of iterations). Stored hashes with a different cost
+# are rehashed in the background on the user's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+logger = logging.getLogger(__name__)
+
+# Threads dedicated to bcrypt (it releases the GIL while hashing)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify calls allowed to wait or run at once before new ones are rejected with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
 
 # HTTP Bearer scheme for Swagger UI
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -34,24 +52,145 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if a stored hash uses a different scheme or cost than BCRYPT_ROUNDS."""
+    return pwd_context.needs_update(hashed_password)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHashPool:
+    """
+    Dedicated thread pool for bcrypt with an async API.
+
+    Keeps CPU-heavy hashing off the event loop and off the threadpool that
+    FastAPI shares with sync endpoints. At most `max_pending` calls may be
+    queued or running; beyond that calls fail fast with PasswordHashingBusy
+    instead of queueing behind a login storm.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=1024)
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHashingBusy("Password hashing queue is full")
+            self._pending += 1
+        start = time.perf_counter()
+
+        def release(_future) -> None:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._latencies.append(elapsed)
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # Released when the job finishes, not when the caller stops waiting:
+        # a cancelled request (client gone) leaves the job running
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters, and latency (queue wait + hashing) over the last 1024 calls."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'completed': self._completed,
+                'rejected': self._rejected,
+            }
+        if latencies:
+            stats['latency_ms_p50'] = round(statistics.median(latencies) * 1000, 2)
+            stats['latency_ms_p99'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2)
+            stats['latency_ms_max'] = round(latencies[-1] * 1000, 2)
+        return stats
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_password_hash_pool: Optional[PasswordHashPool] = None
+_password_hash_pool_lock = threading.Lock()
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    """Return the process-wide password hashing pool, creating it on first use."""
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        with _password_hash_pool_lock:
+            if _password_hash_pool is None:
+                _password_hash_pool = PasswordHashPool()
+                logger.info(
+                    f"Password hash pool started ({_password_hash_pool.workers} workers, "
+                    f"max {_password_hash_pool.max_pending} pending)"
+                )
+    return _password_hash_pool
+
+
+def close_password_hash_pool() -> None:
+    """Shut down the password hashing pool (application shutdown)."""
+    global _password_hash_pool
+    with _password_hash_pool_lock:
+        if _password_hash_pool is not None:
+            _password_hash_pool.close()
+            _password_hash_pool = None
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password hashing pool. Raises PasswordHashingBusy when saturated."""
+    return await get_password_hash_pool().run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password hashing pool. Raises PasswordHashingBusy when saturated."""
+    return await get_password_hash_pool().run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(
     subject: str,
     expires_delta: Optional[timedelta] = None,
+    extra_claims: Optional[dict[str, Any]] = None,
 ) -> str:
     if expires_delta is None:
         expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     now = datetime.now(timezone.utc)
-    to_encode: dict[str, Any] = {"sub": subject, "iat": now, "exp": now + expires_delta}
+    to_encode: dict[str, Any] = {**(extra_claims or {}), "sub": subject, "iat": now, "exp": now + expires_delta}
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
-    """Decode JWT token and return the subject (email), or None if invalid."""
+def decode_access_token_payload(token: str) -> Optional[dict[str, Any]]:
+    """Decode JWT token and return all of its claims, or None if invalid."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    """Decode JWT token and return the subject (email), or None if invalid."""
+    payload = decode_access_token_payload(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
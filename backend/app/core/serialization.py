@@ -0,0 +1,38 @@
+"""
+Fast JSON encoding of subscription rows.
+
+The default response path builds Subscription ORM objects, validates each
+one into SubscriptionRead (from_attributes) and encodes the result. With
+FAST_JSON_RESPONSES=true, list endpoints instead select plain column tuples
+(already typed as the schema declares, see
+app.services.subscriptions._read_column) and encode them directly: with
+orjson when it is installed, otherwise with a precompiled pydantic
+TypeAdapter. The output is byte-for-byte the same JSON; measure with
+scripts/benchmark_serialization.py.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Sequence
+
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Serializes dicts of plain values (str, int, float, bool, date, datetime, None)
+_ROWS_ADAPTER = TypeAdapter(List[Dict[str, Any]])
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Turn column tuples into dicts keyed by `fields` (in select order)."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def dump_rows_json(rows: List[Dict[str, Any]]) -> bytes:
+    """Encode row dicts as a compact JSON array, without validating them."""
+    if orjson is not None:
+        return orjson.dumps(rows)
+    return _ROWS_ADAPTER.dump_json(rows)
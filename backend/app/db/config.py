@@ -1,5 +1,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+import logging
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent  # points to backend/
@@ -7,6 +9,12 @@ ENV_PATH = BASE_DIR / ".env"
 
 load_dotenv(ENV_PATH)
 
+logger = logging.getLogger(__name__)
+
+# Query parameters asyncpg understands; libpq/psycopg2-only ones are
+# translated (sslmode -> ssl, same values) or dropped for the async engine
+_ASYNCPG_QUERY_PARAMS = {"ssl", "host", "prepared_statement_cache_size"}
+
 
 def get_database_url() -> str:
     """
@@ -29,3 +37,24 @@ def get_database_url() -> str:
             db_url = db_url.replace("postgresql://", "postgresql+psycopg2://", 1)
     return db_url
 
+
+def get_async_database_url() -> str:
+    """
+    Database URL for the async engine: the same database as
+    get_database_url(), with the asyncpg (Postgres) or aiosqlite (SQLite) driver.
+    Postgres query parameters are adapted for asyncpg (sslmode becomes ssl).
+    """
+    db_url = get_database_url()
+    if db_url.startswith("postgresql+psycopg2://"):
+        url = make_url(db_url).set(drivername="postgresql+asyncpg")
+        query = dict(url.query)
+        if "sslmode" in query and "ssl" not in query:
+            query["ssl"] = query["sslmode"]
+        dropped = sorted(set(query) - _ASYNCPG_QUERY_PARAMS - {"sslmode"})
+        if dropped:
+            logger.warning(f"Ignoring DATABASE_URL parameters not supported by asyncpg: {', '.join(dropped)}")
+        url = url.set(query={key: value for key, value in query.items() if key in _ASYNCPG_QUERY_PARAMS})
+        return url.render_as_string(hide_password=False)
+    if db_url.startswith("sqlite:///"):
+        return db_url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return db_url
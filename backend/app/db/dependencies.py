@@ -1,5 +1,8 @@
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, get_async_sessionmaker
 
 def get_db() -> Session:
     db = SessionLocal()
@@ -8,3 +11,11 @@ def get_db() -> Session:
     finally:
         db.close()
 
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    AsyncSession for async route handlers. Call the sync service functions
+    with `await db.run_sync(service_fn, *args)`.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
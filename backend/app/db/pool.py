@@ -0,0 +1,146 @@
+"""
+Connection pool configuration and metrics.
+
+Pool sizing comes from the environment so each replica's share of the
+Postgres connection limit can be tuned:
+
+    replicas * (DB_POOL_SIZE + DB_MAX_OVERFLOW) * engines per process <= max_connections
+
+With DB_EXTERNAL_POOLER=true the app keeps no connections of its own
+(NullPool) and leaves pooling to PgBouncer; asyncpg's prepared statement
+caches are disabled so transaction-mode pooling works.
+
+Pooled engines use QueuePool subclasses that time every checkout, so the
+time requests spend waiting for a connection and the connections in use
+can be monitored (see pool_stats()).
+"""
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+# Persistent connections per engine, and extra connections allowed under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds before a connection is replaced (stay below server/proxy idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Set when connecting through PgBouncer (or another external pooler)
+DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "false").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Checkout counters and wait-time samples for one pool."""
+
+    def __init__(self, samples: int = 1024):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=samples)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self._waits.append(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+            }
+        if waits:
+            stats['wait_ms_p50'] = round(statistics.median(waits) * 1000, 3)
+            stats['wait_ms_p99'] = round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3)
+            stats['wait_ms_max'] = round(waits[-1] * 1000, 3)
+        return stats
+
+
+class _TimedCheckoutMixin:
+    """Times QueuePool._do_get: waiting for a free connection, or opening a new one."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return record
+
+    def recreate(self):
+        # Keep counting across engine.dispose() / invalidation
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_pool_kwargs(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine / create_async_engine keyword arguments for the pool."""
+    if url.startswith("sqlite"):
+        # Local development: SQLAlchemy's SQLite defaults
+        return {}
+
+    if DB_EXTERNAL_POOLER:
+        kwargs: Dict[str, Any] = {"poolclass": NullPool}
+        if is_async and "+asyncpg" in url:
+            # PgBouncer transaction mode can't keep named prepared statements per connection
+            kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return kwargs
+
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """Gauges (size, in use, idle, overflow) and checkout wait metrics for a pool."""
+    stats: Dict[str, Any] = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -1,7 +1,11 @@
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from app.db.config import get_database_url
+from app.db.config import get_async_database_url, get_database_url
+from app.db.pool import engine_pool_kwargs, pool_stats
 
 DATABASE_URL = get_database_url()
 
@@ -10,14 +14,53 @@ connect_args = {}
 if DATABASE_URL.startswith("sqlite:///"):
     connect_args = {"check_same_thread": False}
 
+# Postgres: sized, timed pool from DB_POOL_* (or NullPool behind PgBouncer), see app.db.pool
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
-    # For Postgres, use connection pooling
-    pool_pre_ping=True if not DATABASE_URL.startswith("sqlite:///") else False,
+    **engine_pool_kwargs(DATABASE_URL),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async engine for async route handlers (asyncpg / aiosqlite). Created on
+# first use so scripts and migrations don't need the async drivers.
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        async_url = get_async_database_url()
+        _async_engine = create_async_engine(async_url, **engine_pool_kwargs(async_url, is_async=True))
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Factory for AsyncSession; objects stay usable after commit, like the sync sessions' refresh()."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def close_async_engine() -> None:
+    """Dispose the async engine's connection pool (application shutdown)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+def get_pool_stats() -> dict:
+    """Connection pool gauges and checkout wait metrics for the sync and async engines."""
+    stats = {"sync": pool_stats(engine.pool)}
+    if _async_engine is not None:
+        stats["async"] = pool_stats(_async_engine.pool)
+    return stats
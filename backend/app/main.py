@@ -6,6 +6,14 @@ from fastapi.openapi.utils import get_openapi
 from app.api.routes.auth import router as auth_router
 from app.api.routes.subscriptions import router as subscriptions_router
 from app.api.routes.internal import router as internal_router
+from app.api.routes.metrics import router as metrics_router
+
+from app.core.cache import close_response_cache
+from app.core.email import close_smtp_pool
+from app.core.metrics import MetricsMiddleware
+from app.core.query_guard import install_query_guard
+from app.core.security import close_password_hash_pool
+from app.db.session import close_async_engine
 
 # DB
 from app.db.session import Base, engine
@@ -42,8 +50,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor and ETag of GET /subscriptions
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Added last so it wraps everything else; served on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in N+1 / slow query detection for development and tests (QUERY_GUARD=log|raise)
+install_query_guard(app)
+
 
 def custom_openapi():
     if app.openapi_schema:
@@ -80,10 +96,20 @@ async def on_startup():
     pass
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Close pooled SMTP sessions, the password hashing pool, the response cache and the async engine."""
+    close_smtp_pool()
+    close_password_hash_pool()
+    await close_response_cache()
+    await close_async_engine()
+
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(subscriptions_router)
 app.include_router(internal_router)
+app.include_router(metrics_router)
 
 
 # Basic test routes
@@ -1,5 +1,7 @@
+from app.models.email_outbox import EmailOutbox
+from app.models.job_lease import JobLease
 from app.models.subscription import Subscription
 from app.models.user import User
+from app.models.user_spending_rollup import UserSpendingRollup
 
-__all__ = ["User", "Subscription"]
-
+__all__ = ["User", "Subscription", "EmailOutbox", "JobLease", "UserSpendingRollup"]
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, func
+
+from app.db.session import Base
+
+
+class EmailOutbox(Base):
+    """
+    Durable queue of outgoing emails.
+
+    Producers insert rows in bulk; delivery workers claim them with
+    SELECT ... FOR UPDATE SKIP LOCKED (a conditional UPDATE on SQLite),
+    send them, and record the outcome.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Worker claim scan: pending rows that are ready to (re)try
+        Index("ix_email_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    # Prevents the same email from being enqueued twice (e.g. "renewal_reminder:42:2026-10-17")
+    dedupe_key = Column(String(255), unique=True, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    subscription_id = Column(Integer, nullable=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(Text, nullable=False)
+    body = Column(Text, nullable=False)
+    # pending -> sending -> sent | failed (sending rows go back to pending on retry)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=func.now(), nullable=False)
+    claim_token = Column(String(36), nullable=True, index=True)
+    locked_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    sent_at = Column(DateTime, nullable=True)
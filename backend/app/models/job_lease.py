@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.db.session import Base
+
+
+class JobLease(Base):
+    """
+    Time-limited exclusive lease on a named background job.
+
+    Used so that two API replicas or scheduler instances never process the
+    same reminder shard at the same time.
+    """
+
+    __tablename__ = "job_leases"
+
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Integer, Numeric, String, func
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -6,6 +6,18 @@ from app.db.session import Base
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Nightly reminder job: equality lookup on today's due date
+        Index(
+            "ix_subscriptions_reminder_due",
+            "is_active",
+            "reminder_enabled",
+            "reminder_due_date",
+            "next_billing_date",
+        ),
+        # /subscriptions/upcoming: per-user range scan ordered by billing date
+        Index("ix_subscriptions_user_id_next_billing_date", "user_id", "next_billing_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
@@ -19,6 +31,8 @@ class Subscription(Base):
     reminder_enabled = Column(Boolean, default=True, nullable=False)
     reminder_days_before = Column(Integer, default=3, nullable=False)
     last_reminder_sent_at = Column(DateTime, nullable=True)
+    # next_billing_date - reminder_days_before, kept in sync by the service layer
+    reminder_due_date = Column(Date, nullable=True)
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
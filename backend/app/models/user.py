@@ -16,6 +16,10 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     is_superuser = Column(Boolean, default=False, nullable=False)
     default_reminder_days_before = Column(Integer, default=3, nullable=False)
+    # Carried in access tokens as "ver"; bump it to revoke every token issued so far
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
+    # Bumped on every write to the user's subscriptions; versions ETags of read endpoints
+    data_revision = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime,
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, ForeignKey, Integer, Numeric, String
+
+from app.db.session import Base
+
+
+class UserSpendingRollup(Base):
+    """
+    Running totals of a user's active subscriptions, one row per
+    (billing_cycle, category, currency).
+
+    Maintained with deltas by the subscription service in the same
+    transaction as the subscription write; rebuilt and checked for drift by
+    `python -m app.services.rollups`. Prices are stored per billing cycle;
+    monthly normalization happens at read time.
+    """
+
+    __tablename__ = "user_spending_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Lowercased billing cycle
+    billing_cycle = Column(String(20), primary_key=True)
+    # "" for subscriptions without a category
+    category = Column(String(50), primary_key=True)
+    currency = Column(String(10), primary_key=True)
+    subscription_count = Column(Integer, default=0, nullable=False)
+    total_price = Column(Numeric(12, 2), default=0, nullable=False)
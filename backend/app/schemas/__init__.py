@@ -1,6 +1,10 @@
 from app.schemas.subscription import (
     SubscriptionBase,
+    SubscriptionBulkDelete,
+    SubscriptionBulkResult,
+    SubscriptionBulkUpdate,
     SubscriptionCreate,
+    SubscriptionFilter,
     SubscriptionRead,
     SubscriptionUpdate,
 )
@@ -15,5 +19,9 @@ __all__ = [
     "SubscriptionCreate",
     "SubscriptionRead",
     "SubscriptionUpdate",
+    "SubscriptionFilter",
+    "SubscriptionBulkUpdate",
+    "SubscriptionBulkDelete",
+    "SubscriptionBulkResult",
 ]
 
@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -41,6 +41,27 @@ class SubscriptionUpdate(BaseModel):
     reminder_days_before: Optional[int] = None
 
 
+class SubscriptionFilter(BaseModel):
+    """Selects subscriptions for bulk operations; unset fields don't filter."""
+    category: Optional[str] = None
+    is_active: Optional[bool] = None
+    billing_cycle: Optional[str] = None
+
+
+class SubscriptionBulkDelete(BaseModel):
+    """Bulk selection - ids, a filter, or both (combined with AND)."""
+    ids: Optional[List[int]] = None
+    filter: Optional[SubscriptionFilter] = None
+
+
+class SubscriptionBulkUpdate(SubscriptionBulkDelete):
+    update: SubscriptionUpdate
+
+
+class SubscriptionBulkResult(BaseModel):
+    ids: List[int]
+
+
 class SubscriptionRead(SubscriptionBase):
     id: int
     user_id: int
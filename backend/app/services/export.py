@@ -0,0 +1,92 @@
+"""
+Streaming export of a user's subscriptions as NDJSON or CSV.
+
+Rows are read with a server-side cursor (`yield_per`, which implies
+`stream_results`) and encoded one partition at a time, so memory stays
+flat however many rows a user has and the first bytes go out while the
+query is still running.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models import Subscription
+from app.services.subscriptions import LIST_FIELDS
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# SubscriptionRead columns, id first
+EXPORT_FIELDS = ("id", *(field for field in LIST_FIELDS if field != "id"))
+# Rows fetched from the cursor and encoded per chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        [
+            "" if value is None else value.isoformat() if isinstance(value, (date, datetime)) else value
+            for value in row
+        ]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+def stream_subscriptions_export(
+    user_id: int, export_format: str = "ndjson", batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[str]:
+    """
+    Yield a user's subscriptions, ordered by id, as chunks of NDJSON lines
+    or CSV (with a header row).
+
+    Opens its own session, because the response body is produced after the
+    request's dependencies (and their session) may already be closed.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    stmt = (
+        select(*(getattr(Subscription, field) for field in EXPORT_FIELDS))
+        .where(Subscription.user_id == user_id)
+        .order_by(Subscription.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            yield _encode_csv([], header=True)
+        for rows in db.execute(stmt).partitions():
+            if export_format == "csv":
+                yield _encode_csv(rows)
+            else:
+                yield _encode_ndjson(rows)
+    finally:
+        db.close()
@@ -0,0 +1,122 @@
+"""
+Server-side spending forecast.
+
+Computes the actual amount charged in each of the next N calendar months
+for all of a user's active subscriptions at once with NumPy array
+operations, instead of looping per subscription and per month. Mirrors `buildSpendingForecast` in frontend/src/utils/chartData.ts:
+- monthly: charged every month from the billing month on
+- yearly: charged in the billing month and every 12 months after it
+- weekly: charged on every 7th day from the billing date
+- unknown cycles are charged every month
+Subscriptions without a next_billing_date are anchored on created_at.
+"""
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Subscription
+
+MAX_FORECAST_MONTHS = 120
+
+
+def forecast_monthly_totals(
+    prices: np.ndarray,
+    cycles: np.ndarray,
+    anchors: np.ndarray,
+    start: date,
+    months: int,
+) -> np.ndarray:
+    """
+    Per-month charge totals for a set of subscriptions.
+
+    Monthly and yearly cycles are reduced with bincount/cumsum over the
+    month of their first charge; only weekly subscriptions need a
+    (subscriptions, months) matrix of charge counts.
+
+    Args:
+        prices: float64 array of prices per billing cycle
+        cycles: array of lowercased billing cycle strings
+        anchors: datetime64[D] array of first/next billing dates
+        start: any day in the first forecast month
+        months: number of months to forecast
+
+    Returns:
+        float64 array of length `months`
+    """
+    totals = np.zeros(months)
+    if prices.size == 0:
+        return totals
+
+    base_month = np.datetime64(start, "M")
+    # Month of each anchor relative to the first forecast month
+    anchor_month = (anchors.astype("datetime64[M]") - base_month).astype(np.int64)
+
+    is_yearly = cycles == "yearly"
+    is_weekly = cycles == "weekly"
+    is_monthly = ~(is_yearly | is_weekly)
+
+    # Monthly (and unknown): charged in every month from the anchor month on
+    first = np.maximum(anchor_month[is_monthly], 0)
+    in_range = first < months
+    totals += np.cumsum(np.bincount(first[in_range], prices[is_monthly][in_range], minlength=months))
+
+    # Yearly: charged in the anchor month and every 12 months after it
+    first = anchor_month[is_yearly]
+    first = np.where(first < 0, first % 12, first)
+    in_range = first < months
+    yearly = np.bincount(first[in_range], prices[is_yearly][in_range], minlength=months)
+    # Carry each charge forward in steps of 12 months
+    padded = np.zeros(-(-months // 12) * 12)
+    padded[:months] = yearly
+    totals += np.cumsum(padded.reshape(-1, 12), axis=0).ravel()[:months]
+
+    if is_weekly.any():
+        # Day boundaries of each month, as day numbers: months + 1 values
+        month_starts = np.arange(base_month, base_month + months + 1).astype("datetime64[D]").astype(np.int64)
+        days = month_starts[None, :] - anchors[is_weekly].astype(np.int64)[:, None]
+        # Weekly charges strictly before a day: ceil(max(0, day - anchor) / 7)
+        charges_before = (np.maximum(days, 0) + 6) // 7
+        totals += prices[is_weekly] @ np.diff(charges_before, axis=1)
+
+    return totals
+
+
+def get_forecast_for_user(
+    db: Session, user_id: int, months: int = 12, today: Optional[date] = None
+) -> dict:
+    """
+    Forecast a user's actual charges for the next `months` calendar months,
+    starting with the current one.
+
+    Returns {"start_month": "YYYY-MM", "totals": [float, ...]}, one total
+    per month rounded to cents.
+    """
+    today = today or date.today()
+    rows = db.execute(
+        select(
+            Subscription.price,
+            Subscription.billing_cycle,
+            Subscription.next_billing_date,
+            Subscription.created_at,
+        ).where(Subscription.user_id == user_id, Subscription.is_active == True)
+    ).all()
+
+    prices = np.array([float(row.price) for row in rows], dtype=np.float64)
+    cycles = np.array([(row.billing_cycle or "").lower() for row in rows], dtype=object)
+    anchors = np.array(
+        [
+            row.next_billing_date
+            or (row.created_at.date() if row.created_at else today)
+            for row in rows
+        ],
+        dtype="datetime64[D]",
+    )
+
+    totals = forecast_monthly_totals(prices, cycles, anchors, today, months)
+    return {
+        "start_month": today.strftime("%Y-%m"),
+        "totals": [round(float(total), 2) for total in totals],
+    }
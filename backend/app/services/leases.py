@@ -0,0 +1,55 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import JobLease
+
+
+def make_lease_owner() -> str:
+    """Unique owner id for this process/run (host:pid:random)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(db: Session, name: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Try to take (or extend) the lease `name` for `ttl_seconds`.
+
+    Returns True if `owner` now holds the lease, False if another owner
+    holds an unexpired lease. Works the same on Postgres and SQLite: the
+    conditional UPDATE takes over an expired lease, and the primary key
+    makes concurrent first-time INSERTs race-safe.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    result = db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, or_(JobLease.expires_at < now, JobLease.owner == owner))
+        .values(owner=owner, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.commit()
+        return True
+
+    db.add(JobLease(name=name, owner=owner, expires_at=expires_at))
+    try:
+        db.commit()
+        return True
+    except IntegrityError:
+        # Someone else holds it
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, name: str, owner: str) -> None:
+    """Release the lease `name` if `owner` still holds it."""
+    db.query(JobLease).filter(JobLease.name == name, JobLease.owner == owner).delete(
+        synchronize_session=False
+    )
+    db.commit()
@@ -0,0 +1,310 @@
+"""
+Email outbox: durable, horizontally scalable email delivery.
+
+Producers (e.g. the reminder job) bulk-insert rows into `email_outbox`
+inside their own transaction. Any number of worker processes then claim
+batches of rows, deliver them concurrently, and record the outcome.
+
+Run a worker with:
+    python -m app.services.outbox
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.email import AsyncSMTPConnectionPool, send_email_async
+from app.core.metrics import OUTBOX_EMAILS
+from app.db.session import SessionLocal
+from app.models import EmailOutbox, Subscription
+from app.services.revisions import bump_data_revision
+
+logger = logging.getLogger(__name__)
+
+# Number of rows claimed and delivered per batch
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+# Maximum number of emails delivered concurrently by one worker
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+# How long a claimed row stays locked before another worker may reclaim it
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+# Attempts before a row is marked failed, and the base retry delay (doubled per attempt)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_DELAY = int(os.getenv("OUTBOX_RETRY_DELAY", "60"))
+# Seconds a worker sleeps when the outbox is empty
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+
+REMINDER_EMAIL_KIND = "renewal_reminder"
+
+
+def _mask_email(email: str) -> str:
+    """Partially mask an email address for logging."""
+    return f"{email[:3]}***@{email.split('@')[1] if '@' in email else '***'}"
+
+
+def _utcnow() -> datetime:
+    """Naive UTC timestamp, matching the DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_emails(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Bulk-insert outbox rows in a single multi-row INSERT.
+
+    Rows whose dedupe_key is already queued are skipped. Returns the ids of
+    the rows actually inserted. Does not commit, so callers can enqueue in
+    the same transaction as their own writes.
+    """
+    if not rows:
+        return []
+
+    now = _utcnow()
+    values = [{"status": "pending", "attempts": 0, "available_at": now, "created_at": now, **row} for row in rows]
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(EmailOutbox).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(EmailOutbox).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    else:
+        stmt = insert(EmailOutbox)
+
+    return list(db.execute(stmt.returning(EmailOutbox.id), values).scalars())
+
+
+def claim_outbox_batch(
+    db: Session, limit: int, lease_seconds: Optional[int] = None, criteria: Sequence = ()
+) -> list:
+    """
+    Claim up to `limit` deliverable rows for this worker and return them.
+    `criteria` (SQL expressions on EmailOutbox) restrict which rows qualify.
+
+    On Postgres, candidates are locked with SELECT ... FOR UPDATE SKIP LOCKED
+    so concurrent workers never wait on each other. On SQLite (where FOR
+    UPDATE is a no-op) the conditional UPDATE below is what makes the claim
+    exclusive: only rows still claimable at write time get this batch's token.
+    """
+    now = _utcnow()
+    lease = timedelta(seconds=lease_seconds or OUTBOX_LEASE_SECONDS)
+    claimable = and_(
+        or_(
+            and_(EmailOutbox.status == "pending", EmailOutbox.available_at <= now),
+            # Rows left "sending" by a crashed worker become claimable once their lease expires
+            and_(EmailOutbox.status == "sending", EmailOutbox.locked_until < now),
+        ),
+        *criteria,
+    )
+
+    ids = db.execute(
+        select(EmailOutbox.id)
+        .where(claimable)
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.commit()
+        return []
+
+    token = str(uuid.uuid4())
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), claimable)
+        .values(
+            status="sending",
+            claim_token=token,
+            locked_until=now + lease,
+            attempts=EmailOutbox.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return db.execute(
+        select(
+            EmailOutbox.id,
+            EmailOutbox.kind,
+            EmailOutbox.user_id,
+            EmailOutbox.subscription_id,
+            EmailOutbox.to_email,
+            EmailOutbox.subject,
+            EmailOutbox.body,
+            EmailOutbox.attempts,
+        )
+        .where(EmailOutbox.claim_token == token)
+        .order_by(EmailOutbox.id)
+    ).all()
+
+
+def _record_results(db: Session, rows: list, errors: List[Optional[Exception]]) -> Dict[str, int]:
+    """Persist delivery outcomes for a claimed batch in one transaction."""
+    now = _utcnow()
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    sent_ids = [row.id for row, error in zip(rows, errors) if error is None]
+    if sent_ids:
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=now, claim_token=None, locked_until=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        # Record reminder delivery on the subscriptions themselves
+        reminded = [
+            row.subscription_id
+            for row, error in zip(rows, errors)
+            if error is None and row.kind == REMINDER_EMAIL_KIND and row.subscription_id
+        ]
+        if reminded:
+            db.execute(
+                update(Subscription)
+                .where(Subscription.id.in_(reminded))
+                .values(last_reminder_sent_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            # last_reminder_sent_at is part of the subscriptions API response
+            bump_data_revision(
+                db,
+                {
+                    row.user_id
+                    for row, error in zip(rows, errors)
+                    if error is None and row.kind == REMINDER_EMAIL_KIND and row.user_id
+                },
+            )
+        stats['sent'] = len(sent_ids)
+
+    for row, error in zip(rows, errors):
+        if error is None:
+            continue
+        if row.attempts >= OUTBOX_MAX_ATTEMPTS:
+            values = {"status": "failed"}
+            stats['failed'] += 1
+        else:
+            delay = OUTBOX_RETRY_DELAY * (2 ** (row.attempts - 1))
+            values = {"status": "pending", "available_at": now + timedelta(seconds=delay)}
+            stats['retried'] += 1
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == row.id)
+            .values(claim_token=None, locked_until=None, last_error=str(error)[:1000], **values)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+    for result, count in stats.items():
+        OUTBOX_EMAILS.inc(count, result=result)
+    return stats
+
+
+async def _deliver(
+    semaphore: asyncio.Semaphore,
+    pool: Optional[AsyncSMTPConnectionPool],
+    row,
+) -> Optional[Exception]:
+    """Deliver one outbox row under the concurrency semaphore; return the error, if any."""
+    async with semaphore:
+        try:
+            await send_email_async(to_email=row.to_email, subject=row.subject, body=row.body, pool=pool)
+        except Exception as e:
+            logger.error(f"Error delivering outbox email id={row.id} (attempt {row.attempts}): {str(e)}")
+            return e
+    logger.info(
+        f"Email delivered: outbox_id={row.id}, kind={row.kind}, "
+        f"subscription_id={row.subscription_id}, email={_mask_email(row.to_email)}"
+    )
+    return None
+
+
+async def deliver_outbox_batch(
+    *,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    criteria: Sequence = (),
+) -> Dict[str, int]:
+    """
+    Claim one batch of outbox rows (matching `criteria`, if given), deliver
+    them concurrently, and record the results.
+
+    Returns statistics: {'claimed', 'sent', 'retried', 'failed'}.
+    """
+    batch_size = max(1, batch_size or OUTBOX_BATCH_SIZE)
+    concurrency = max(1, concurrency or OUTBOX_CONCURRENCY)
+
+    db = SessionLocal()
+    try:
+        rows = await asyncio.to_thread(claim_outbox_batch, db, batch_size, None, criteria)
+        if not rows:
+            return {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+        semaphore = asyncio.Semaphore(concurrency)
+        pool = AsyncSMTPConnectionPool.from_env(max_connections=concurrency)
+        try:
+            errors = await asyncio.gather(*(_deliver(semaphore, pool, row) for row in rows))
+        finally:
+            if pool is not None:
+                await pool.close()
+
+        stats = await asyncio.to_thread(_record_results, db, rows, errors)
+        stats['claimed'] = len(rows)
+        logger.info(
+            f"Outbox batch delivered: claimed={stats['claimed']}, sent={stats['sent']}, "
+            f"retried={stats['retried']}, failed={stats['failed']}"
+        )
+        return stats
+    finally:
+        db.close()
+
+
+async def drain_outbox(
+    *,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    criteria: Sequence = (),
+) -> Dict[str, int]:
+    """
+    Deliver batches until nothing (matching `criteria`, if given) is
+    currently deliverable; return summed statistics.
+    """
+    totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        stats = await deliver_outbox_batch(batch_size=batch_size, concurrency=concurrency, criteria=criteria)
+        for key in totals:
+            totals[key] += stats[key]
+        if stats['claimed'] == 0:
+            return totals
+
+
+async def run_outbox_worker(
+    *,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    poll_interval: Optional[float] = None,
+) -> None:
+    """Deliver outbox emails forever, sleeping `poll_interval` seconds whenever the outbox is empty."""
+    poll_interval = OUTBOX_POLL_INTERVAL if poll_interval is None else poll_interval
+    logger.info(f"Outbox worker started (poll interval {poll_interval}s)")
+    while True:
+        try:
+            stats = await deliver_outbox_batch(batch_size=batch_size, concurrency=concurrency)
+        except Exception as e:
+            logger.error(f"Error in outbox worker: {str(e)}", exc_info=True)
+            stats = {'claimed': 0}
+        if stats['claimed'] == 0:
+            await asyncio.sleep(poll_interval)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(run_outbox_worker())
+    except KeyboardInterrupt:
+        logger.info("Outbox worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,160 +1,334 @@
+import asyncio
 import logging
+import os
+import time
 from datetime import date, timedelta, datetime, timezone
-from typing import Dict
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
 
+from app.core.metrics import (
+    REMINDER_ERRORS,
+    REMINDER_RUN_DURATION,
+    REMINDER_RUNS,
+    REMINDERS_SENT,
+    REMINDERS_SKIPPED,
+)
 from app.db.session import SessionLocal
-from app.models import User, Subscription
-from app.core.email import send_email
+from app.models import EmailOutbox, User, Subscription
+from app.services.leases import acquire_lease, make_lease_owner, release_lease
+from app.services.outbox import REMINDER_EMAIL_KIND, drain_outbox, enqueue_emails
 
 logger = logging.getLogger(__name__)
 
+# Number of reminders inserted into the outbox per INSERT statement
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# How long a reminder shard lease is held before another replica may take over
+REMINDER_LEASE_SECONDS = int(os.getenv("REMINDER_LEASE_SECONDS", "600"))
 
-def process_renewal_reminders(within_days: int = 7) -> Dict[str, int]:
+
+def render_reminder_email(subscription) -> Tuple[str, str]:
+    """Build the (subject, body) of a renewal reminder for a subscription."""
+    subject = f"Upcoming subscription renewal: {subscription.name}"
+
+    body = f"""Hello,
+
+This is a reminder about your upcoming subscription renewal.
+
+Subscription Details:
+- Name: {subscription.name}
+- Price: {subscription.currency} {subscription.price:.2f}
+- Billing Cycle: {subscription.billing_cycle}
+- Next Billing Date: {subscription.next_billing_date.strftime('%B %d, %Y')}
+
+You configured SubTrack to remind you {subscription.reminder_days_before} days before renewal.
+
+You can manage your subscriptions at your SubTrack dashboard.
+
+Best regards,
+SubTrack Team
+"""
+    return subject, body
+
+
+def shard_filter(shard_index: int, shard_count: int):
+    """
+    SQL condition selecting one shard of subscriptions, partitioned by
+    user_id so that all of a user's reminders land in the same shard.
     """
-    Scan all users and send renewal reminder emails for subscriptions
-    that are within `within_days` days of next_billing_date,
-    respecting reminder_enabled, reminder_days_before, and last_reminder_sent_at.
-    
-    Idempotent: Won't send if last_reminder_sent_at is within the last 24 hours.
-    
+    return Subscription.user_id % shard_count == shard_index
+
+
+def _fetch_due_reminders(
+    db: Session,
+    today: date,
+    cutoff_time: datetime,
+    within_days: int,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Tuple[int, list]:
+    """
+    Return (number of subscriptions in the window, rows due today).
+
+    Rows carry only the columns the reminder email needs.
+    """
+    window_filters = (
+        Subscription.is_active == True,
+        Subscription.reminder_enabled == True,
+        Subscription.next_billing_date.isnot(None),
+        Subscription.next_billing_date >= today,
+        Subscription.next_billing_date <= today + timedelta(days=within_days),
+    )
+    if shard_count > 1:
+        window_filters += (shard_filter(shard_index, shard_count),)
+
+    # Cheap aggregate for stats: everything in the window that is not due is skipped
+    total = db.query(func.count(Subscription.id)).filter(*window_filters).scalar() or 0
+
+    # Only select rows due today (served by ix_subscriptions_reminder_due),
+    # and only the columns the email needs
+    due_rows = (
+        db.query(
+            Subscription.id,
+            Subscription.user_id,
+            Subscription.name,
+            Subscription.price,
+            Subscription.currency,
+            Subscription.billing_cycle,
+            Subscription.next_billing_date,
+            Subscription.reminder_days_before,
+            User.email.label("email"),
+        )
+        .join(User, Subscription.user_id == User.id)
+        .filter(
+            *window_filters,
+            Subscription.reminder_due_date == today,
+            # Idempotency: skip if reminder was sent in last 24 hours
+            or_(
+                Subscription.last_reminder_sent_at.is_(None),
+                Subscription.last_reminder_sent_at <= cutoff_time.replace(tzinfo=None),
+            ),
+        )
+        .order_by(Subscription.id)
+        .all()
+    )
+    return total, due_rows
+
+
+def enqueue_renewal_reminders(
+    db: Session,
+    within_days: int = 7,
+    *,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Dict[str, int]:
+    """
+    Producer step: render every reminder due today and enqueue them in the
+    email outbox with bulk INSERTs, in one transaction. Delivery happens
+    later in an outbox worker (see app.services.outbox).
+
+    With shard_count > 1 only subscriptions where
+    user_id % shard_count == shard_index are considered, so N invocations
+    with shard_index 0..N-1 split the day's load into disjoint slices.
+
+    Idempotent: reminders already queued for the same billing date are not
+    enqueued again, and subscriptions reminded in the last 24 hours are not
+    selected.
+
     Returns:
         Dict with statistics: {
-            'reminders_sent': int,
+            'reminders_sent': int,  # reminders queued for delivery
             'reminders_skipped': int,
             'errors': int,
             'total_processed': int
         }
     """
-    db = SessionLocal()
     stats = {
         'reminders_sent': 0,
         'reminders_skipped': 0,
         'errors': 0,
         'total_processed': 0
     }
-    
-    try:
-        today = date.today()
-        now = datetime.now(timezone.utc)
-        # Idempotency: don't send if reminder was sent in last 24 hours
-        cutoff_time = now - timedelta(hours=24)
-        
-        # Optimized query: Get all subscriptions that need reminders in a single query
-        # Join with User to get email in one go
-        subscriptions = (
-            db.query(Subscription)
-            .join(User)
-            .options(joinedload(Subscription.user))
-            .filter(
-                Subscription.is_active == True,
-                Subscription.reminder_enabled == True,
-                Subscription.next_billing_date.isnot(None),
-                Subscription.next_billing_date >= today,
-                Subscription.next_billing_date <= today + timedelta(days=within_days),
+
+    started = time.perf_counter()
+    today = date.today()
+    # Idempotency: don't send if reminder was sent in last 24 hours
+    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
+
+    total, due_rows = _fetch_due_reminders(
+        db, today, cutoff_time, within_days, shard_index, shard_count
+    )
+    stats['total_processed'] = total
+    stats['reminders_skipped'] = total - len(due_rows)
+
+    logger.info(f"Found {len(due_rows)} due reminders out of {total} subscriptions in window")
+
+    messages = []
+    for row in due_rows:
+        if not row.email:
+            logger.warning(f"User {row.user_id} has no email, skipping subscription {row.id}")
+            stats['reminders_skipped'] += 1
+            continue
+        try:
+            subject, body = render_reminder_email(row)
+        except Exception as e:
+            stats['errors'] += 1
+            logger.error(
+                f"Error rendering reminder for subscription_id={row.id}, "
+                f"user_id={row.user_id}: {str(e)}",
+                exc_info=True
             )
-            .all()
-        )
-        
-        logger.info(f"Found {len(subscriptions)} potential reminders to process")
-        
-        for subscription in subscriptions:
-            stats['total_processed'] += 1
-            
-            try:
-                # Calculate days until renewal
-                days_until = (subscription.next_billing_date - today).days
-                
-                # Check if it's exactly reminder_days_before days before
-                if days_until != subscription.reminder_days_before:
-                    stats['reminders_skipped'] += 1
-                    continue
-                
-                # Idempotency check: Skip if reminder was sent in last 24 hours
-                if subscription.last_reminder_sent_at:
-                    # Convert to UTC if it's naive datetime
-                    last_sent = subscription.last_reminder_sent_at
-                    if last_sent.tzinfo is None:
-                        # Assume UTC if timezone-naive
-                        last_sent = last_sent.replace(tzinfo=timezone.utc)
-                    
-                    if last_sent > cutoff_time:
-                        stats['reminders_skipped'] += 1
-                        logger.debug(
-                            f"Skipping subscription {subscription.id} - "
-                            f"reminder sent {last_sent} (within 24 hours)"
-                        )
-                        continue
-                
-                # Get user email (already loaded via joinedload)
-                user_email = subscription.user.email
-                if not user_email:
-                    logger.warning(f"User {subscription.user_id} has no email, skipping subscription {subscription.id}")
-                    stats['reminders_skipped'] += 1
-                    continue
-                
-                # Send the reminder email
-                subject = f"Upcoming subscription renewal: {subscription.name}"
-                
-                body = f"""Hello,
+            continue
+        messages.append({
+            "kind": REMINDER_EMAIL_KIND,
+            "dedupe_key": f"{REMINDER_EMAIL_KIND}:{row.id}:{row.next_billing_date.isoformat()}",
+            "user_id": row.user_id,
+            "subscription_id": row.id,
+            "to_email": row.email,
+            "subject": subject,
+            "body": body,
+        })
 
-This is a reminder about your upcoming subscription renewal.
+    queued = 0
+    for start in range(0, len(messages), REMINDER_BATCH_SIZE):
+        queued += len(enqueue_emails(db, messages[start:start + REMINDER_BATCH_SIZE]))
+    db.commit()
 
-Subscription Details:
-- Name: {subscription.name}
-- Price: {subscription.currency} {subscription.price:.2f}
-- Billing Cycle: {subscription.billing_cycle}
-- Next Billing Date: {subscription.next_billing_date.strftime('%B %d, %Y')}
+    stats['reminders_sent'] = queued
+    # Already queued for this billing date (e.g. cron ran twice before delivery)
+    stats['reminders_skipped'] += len(messages) - queued
 
-You configured SubTrack to remind you {subscription.reminder_days_before} days before renewal.
+    REMINDER_RUNS.inc()
+    REMINDERS_SENT.inc(stats['reminders_sent'])
+    REMINDERS_SKIPPED.inc(stats['reminders_skipped'])
+    REMINDER_ERRORS.inc(stats['errors'])
+    REMINDER_RUN_DURATION.observe(time.perf_counter() - started)
 
-You can manage your subscriptions at your SubTrack dashboard.
+    logger.info(
+        f"Reminder enqueue complete: queued={queued}, "
+        f"skipped={stats['reminders_skipped']}, errors={stats['errors']}, "
+        f"total={stats['total_processed']}"
+    )
+    return stats
 
-Best regards,
-SubTrack Team
-"""
-                
-                # Send email (this is the potentially slow operation)
-                send_email(
-                    to_email=user_email,
-                    subject=subject,
-                    body=body,
-                )
-                
-                # Update last_reminder_sent_at atomically
-                subscription.last_reminder_sent_at = now
-                db.commit()
-                
-                stats['reminders_sent'] += 1
-                logger.info(
-                    f"Reminder sent: subscription_id={subscription.id}, "
-                    f"name='{subscription.name}', user_id={subscription.user_id}, "
-                    f"email={user_email[:3]}***@{user_email.split('@')[1] if '@' in user_email else '***'}"
-                )
-                
-            except Exception as e:
-                stats['errors'] += 1
-                # Log error but continue processing other subscriptions
-                logger.error(
-                    f"Error processing reminder for subscription_id={subscription.id}, "
-                    f"user_id={subscription.user_id}: {str(e)}",
-                    exc_info=True
-                )
-                # Rollback this subscription's transaction
-                db.rollback()
-                continue
-        
-        logger.info(
-            f"Reminder processing complete: sent={stats['reminders_sent']}, "
-            f"skipped={stats['reminders_skipped']}, errors={stats['errors']}, "
-            f"total={stats['total_processed']}"
+
+def enqueue_reminder_shard(
+    db: Session,
+    within_days: int = 7,
+    *,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Optional[Dict[str, int]]:
+    """
+    Run enqueue_renewal_reminders for one shard while holding that shard's
+    lease (see app.services.leases), so two replicas never process the
+    same shard concurrently.
+
+    Returns the statistics, or None if another process holds the lease.
+    """
+    lease_name = f"renewal-reminders:{shard_index}/{shard_count}"
+    owner = make_lease_owner()
+    if not acquire_lease(db, lease_name, owner, REMINDER_LEASE_SECONDS):
+        logger.info(f"Reminder shard {shard_index}/{shard_count} is already being processed, skipping")
+        return None
+    try:
+        return enqueue_renewal_reminders(
+            db, within_days, shard_index=shard_index, shard_count=shard_count
+        )
+    finally:
+        try:
+            release_lease(db, lease_name, owner)
+        except Exception as e:
+            # The lease expires on its own
+            logger.warning(f"Failed to release lease {lease_name}: {str(e)}")
+            db.rollback()
+
+
+async def process_renewal_reminders_async(
+    within_days: int = 7,
+    *,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Enqueue today's renewal reminders for one shard and deliver that
+    shard's reminders from the outbox in-process.
+
+    For deployments without a separate outbox worker (e.g. the in-app
+    scheduler). Only reminder rows of this shard's users are delivered, so
+    sharded schedulers never compete for the same rows; other outbox rows
+    are left to their own shard or an outbox worker. `batch_size` and
+    `concurrency` are passed to the outbox delivery (OUTBOX_BATCH_SIZE /
+    OUTBOX_CONCURRENCY by default).
+
+    Returns:
+        Dict with statistics: {
+            'reminders_queued': int,  # queued by this run
+            'reminders_sent': int,  # this shard's reminders delivered (may include earlier retries)
+            'reminders_skipped': int,
+            'errors': int,
+            'total_processed': int
+        }
+    """
+    db = SessionLocal()
+    try:
+        stats = await asyncio.to_thread(
+            enqueue_reminder_shard,
+            db,
+            within_days,
+            shard_index=shard_index,
+            shard_count=shard_count,
         )
-        
     except Exception as e:
         logger.error(f"Error in process_renewal_reminders: {str(e)}", exc_info=True)
-        stats['errors'] += 1
+        return {
+            'reminders_queued': 0, 'reminders_sent': 0, 'reminders_skipped': 0, 'errors': 1, 'total_processed': 0
+        }
     finally:
         db.close()
-    
+
+    if stats is None:
+        # Another replica holds this shard; it will enqueue and deliver
+        return {
+            'reminders_queued': 0, 'reminders_sent': 0, 'reminders_skipped': 0, 'errors': 0, 'total_processed': 0
+        }
+
+    stats['reminders_queued'] = stats['reminders_sent']
+    criteria = [EmailOutbox.kind == REMINDER_EMAIL_KIND]
+    if shard_count > 1:
+        criteria.append(EmailOutbox.user_id % shard_count == shard_index)
+    try:
+        delivery = await drain_outbox(batch_size=batch_size, concurrency=concurrency, criteria=criteria)
+        stats['reminders_sent'] = delivery['sent']
+        stats['errors'] += delivery['retried'] + delivery['failed']
+    except Exception as e:
+        logger.error(f"Error delivering outbox: {str(e)}", exc_info=True)
+        stats['reminders_sent'] = 0
+        stats['errors'] += 1
+
     return stats
+
+
+def process_renewal_reminders(
+    within_days: int = 7,
+    *,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Synchronous wrapper around process_renewal_reminders_async for callers
+    without an event loop (scheduler thread, scripts).
+    """
+    return asyncio.run(
+        process_renewal_reminders_async(
+            within_days,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            batch_size=batch_size,
+            concurrency=concurrency,
+        )
+    )
@@ -0,0 +1,40 @@
+"""
+Per-user data revision: a counter on users.data_revision that every write
+to a user's subscriptions (or to data derived from them) increments in the
+same transaction.
+
+Read endpoints use it as a cheap version stamp for ETags: when a client's
+If-None-Match still carries the current revision, they answer 304 without
+running their query. The response cache (app.core.cache) keys entries by
+it too, so a committed write retires the user's cached responses.
+"""
+from typing import Iterable, Optional, Union
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+
+def bump_data_revision(db: Session, user_ids: Union[int, Iterable[int], None]) -> None:
+    """
+    Increment data_revision for one user id or a collection of ids. None
+    bumps every user.
+
+    Does not commit; call it in the transaction that changes the data,
+    after the subscription rows are written.
+    """
+    stmt = update(User).values(data_revision=User.data_revision + 1)
+    if user_ids is not None:
+        user_ids = [user_ids] if isinstance(user_ids, int) else sorted(set(user_ids))
+        if not user_ids:
+            return
+        stmt = stmt.where(User.id.in_(user_ids))
+    # Core UPDATE: no ORM flush events, so the principal cache is left alone
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+
+def get_data_revision(db: Session, user_id: int) -> Optional[int]:
+    """Current data_revision of a user (None if the user does not exist)."""
+    return db.execute(select(User.data_revision).where(User.id == user_id)).scalar_one_or_none()
+
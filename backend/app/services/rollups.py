@@ -0,0 +1,310 @@
+"""
+Per-user spending rollup (`user_spending_rollup`).
+
+The subscription service calls `apply_subscription_delta` before it
+commits, so the rollup moves in the same transaction as the subscription
+row. `rebuild_rollups` recomputes it from `subscriptions` and
+`find_rollup_drift` reports rows that disagree.
+
+Verify or rebuild from the command line with:
+    python -m app.services.rollups --verify
+    python -m app.services.rollups [--user-id ID]
+"""
+import argparse
+import logging
+import sys
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models import Subscription, UserSpendingRollup
+from app.services.revisions import bump_data_revision
+
+logger = logging.getLogger(__name__)
+
+# (user_id, billing_cycle, category, currency)
+RollupKey = Tuple[int, str, str, str]
+# (subscription_count, total_price)
+RollupTotals = Tuple[int, Decimal]
+
+_CENT = Decimal("0.01")
+
+
+def rollup_key(user_id: int, billing_cycle: str, category: Optional[str], currency: str) -> RollupKey:
+    """Rollup primary key for a subscription's attributes."""
+    return (user_id, (billing_cycle or "").lower(), category or "", currency)
+
+
+def _to_decimal(price) -> Decimal:
+    return Decimal(str(price)).quantize(_CENT)
+
+
+def subscription_contribution(subscription) -> Optional[Tuple[RollupKey, Decimal]]:
+    """
+    The (key, price) a subscription adds to the rollup, or None if it does
+    not count (inactive).
+    """
+    if not subscription.is_active:
+        return None
+    key = rollup_key(
+        subscription.user_id,
+        subscription.billing_cycle,
+        subscription.category,
+        subscription.currency,
+    )
+    return key, _to_decimal(subscription.price)
+
+
+def apply_rollup_delta(db: Session, key: RollupKey, count_delta: int, price_delta: Decimal) -> None:
+    """
+    Add a delta to one rollup row, creating it if needed. Does not commit.
+
+    Uses a single INSERT ... ON CONFLICT DO UPDATE on Postgres and SQLite so
+    concurrent writers for the same user never lose an update.
+    """
+    user_id, billing_cycle, category, currency = key
+    values = {
+        "user_id": user_id,
+        "billing_cycle": billing_cycle,
+        "category": category,
+        "currency": currency,
+        "subscription_count": count_delta,
+        "total_price": price_delta,
+    }
+    pk = ["user_id", "billing_cycle", "category", "currency"]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(UserSpendingRollup).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=pk,
+            set_={
+                "subscription_count": UserSpendingRollup.subscription_count + stmt.excluded.subscription_count,
+                "total_price": UserSpendingRollup.total_price + stmt.excluded.total_price,
+            },
+        )
+        db.execute(stmt)
+    else:
+        result = db.execute(
+            update(UserSpendingRollup)
+            .where(
+                UserSpendingRollup.user_id == user_id,
+                UserSpendingRollup.billing_cycle == billing_cycle,
+                UserSpendingRollup.category == category,
+                UserSpendingRollup.currency == currency,
+            )
+            .values(
+                subscription_count=UserSpendingRollup.subscription_count + count_delta,
+                total_price=UserSpendingRollup.total_price + price_delta,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(UserSpendingRollup).values(**values))
+
+    if count_delta < 0:
+        # Drop rows whose last subscription just left them
+        db.execute(
+            delete(UserSpendingRollup)
+            .where(
+                UserSpendingRollup.user_id == user_id,
+                UserSpendingRollup.billing_cycle == billing_cycle,
+                UserSpendingRollup.category == category,
+                UserSpendingRollup.currency == currency,
+                UserSpendingRollup.subscription_count <= 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_subscription_delta(
+    db: Session,
+    old: Optional[Tuple[RollupKey, Decimal]],
+    new: Optional[Tuple[RollupKey, Decimal]],
+) -> None:
+    """
+    Move a subscription's contribution from `old` to `new` (either may be
+    None for create/delete/deactivate). Does not commit.
+    """
+    if old == new:
+        return
+    if old is not None and new is not None and old[0] == new[0]:
+        apply_rollup_delta(db, new[0], 0, new[1] - old[1])
+        return
+    if old is not None:
+        apply_rollup_delta(db, old[0], -1, -old[1])
+    if new is not None:
+        apply_rollup_delta(db, new[0], 1, new[1])
+
+
+def apply_contributions(db: Session, contributions, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) many subscriptions' contributions, with
+    one delta per rollup row instead of one per subscription. Does not commit.
+    """
+    deltas: Dict[RollupKey, List] = {}
+    for contribution in contributions:
+        if contribution is None:
+            continue
+        key, price = contribution
+        delta = deltas.setdefault(key, [0, Decimal(0)])
+        delta[0] += 1
+        delta[1] += price
+    for key, (count, total) in deltas.items():
+        apply_rollup_delta(db, key, sign * count, sign * total)
+
+
+def get_rollup_rows(db: Session, user_id: int) -> list:
+    """All rollup rows for a user (a primary-key prefix lookup)."""
+    return db.execute(
+        select(
+            UserSpendingRollup.billing_cycle,
+            UserSpendingRollup.category,
+            UserSpendingRollup.currency,
+            UserSpendingRollup.subscription_count,
+            UserSpendingRollup.total_price,
+        ).where(UserSpendingRollup.user_id == user_id)
+    ).all()
+
+
+def compute_rollups(
+    db: Session, user_id: Optional[int] = None, subscription_ids: Optional[List[int]] = None
+) -> Dict[RollupKey, RollupTotals]:
+    """Recompute rollup totals from the subscriptions table, optionally for some subscriptions only."""
+    cycle = func.lower(Subscription.billing_cycle)
+    category = func.coalesce(Subscription.category, "")
+    stmt = (
+        select(
+            Subscription.user_id,
+            cycle,
+            category,
+            Subscription.currency,
+            func.count(Subscription.id),
+            func.coalesce(func.sum(Subscription.price), 0),
+        )
+        .where(Subscription.is_active == True)
+        .group_by(Subscription.user_id, cycle, category, Subscription.currency)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Subscription.user_id == user_id)
+    if subscription_ids is not None:
+        stmt = stmt.where(Subscription.id.in_(subscription_ids))
+    return {
+        (uid, cyc, cat, cur): (count, _to_decimal(total))
+        for uid, cyc, cat, cur, count, total in db.execute(stmt)
+    }
+
+
+def apply_rollup_difference(
+    db: Session, before: Dict[RollupKey, RollupTotals], after: Dict[RollupKey, RollupTotals]
+) -> None:
+    """
+    Apply the change between two compute_rollups results for the same set of
+    subscriptions (e.g. taken around a set-based UPDATE). Does not commit.
+    """
+    zero = (0, Decimal(0))
+    for key in sorted(before.keys() | after.keys()):
+        old_count, old_total = before.get(key, zero)
+        new_count, new_total = after.get(key, zero)
+        if (old_count, old_total) != (new_count, new_total):
+            apply_rollup_delta(db, key, new_count - old_count, new_total - old_total)
+
+
+def load_rollups(db: Session, user_id: Optional[int] = None) -> Dict[RollupKey, RollupTotals]:
+    """Read the stored rollup rows, ignoring empty ones."""
+    stmt = select(
+        UserSpendingRollup.user_id,
+        UserSpendingRollup.billing_cycle,
+        UserSpendingRollup.category,
+        UserSpendingRollup.currency,
+        UserSpendingRollup.subscription_count,
+        UserSpendingRollup.total_price,
+    ).where(UserSpendingRollup.subscription_count != 0)
+    if user_id is not None:
+        stmt = stmt.where(UserSpendingRollup.user_id == user_id)
+    return {
+        (uid, cyc, cat, cur): (count, _to_decimal(total))
+        for uid, cyc, cat, cur, count, total in db.execute(stmt)
+    }
+
+
+def find_rollup_drift(
+    db: Session, user_id: Optional[int] = None
+) -> List[Tuple[RollupKey, Optional[RollupTotals], Optional[RollupTotals]]]:
+    """Return (key, expected, stored) for every rollup row that disagrees with the subscriptions."""
+    expected = compute_rollups(db, user_id)
+    stored = load_rollups(db, user_id)
+    return [
+        (key, expected.get(key), stored.get(key))
+        for key in sorted(expected.keys() | stored.keys())
+        if expected.get(key) != stored.get(key)
+    ]
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Replace the rollup rows (for one user, or everyone) with totals
+    recomputed from the subscriptions table, in one transaction.
+
+    Returns the number of rollup rows written.
+    """
+    totals = compute_rollups(db, user_id)
+    stmt = delete(UserSpendingRollup)
+    if user_id is not None:
+        stmt = stmt.where(UserSpendingRollup.user_id == user_id)
+    db.execute(stmt.execution_options(synchronize_session=False))
+    if totals:
+        db.execute(
+            insert(UserSpendingRollup),
+            [
+                {
+                    "user_id": uid,
+                    "billing_cycle": cyc,
+                    "category": cat,
+                    "currency": cur,
+                    "subscription_count": count,
+                    "total_price": total,
+                }
+                for (uid, cyc, cat, cur), (count, total) in totals.items()
+            ],
+        )
+    # A rebuild that fixes drift changes /subscriptions/summary
+    bump_data_revision(db, user_id)
+    db.commit()
+    return len(totals)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild or verify the user_spending_rollup table.")
+    parser.add_argument("--verify", action="store_true", help="only report drift, do not rebuild")
+    parser.add_argument("--user-id", type=int, default=None, help="limit to one user")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        drift = find_rollup_drift(db, args.user_id)
+        for key, expected, stored in drift:
+            logger.warning(f"Rollup drift for {key}: expected={expected}, stored={stored}")
+        logger.info(f"Found {len(drift)} drifted rollup rows")
+        if args.verify:
+            return 1 if drift else 0
+
+        written = rebuild_rollups(db, args.user_id)
+        logger.info(f"Rebuilt {written} rollup rows")
+        remaining = find_rollup_drift(db, args.user_id)
+        if remaining:
+            logger.error(f"{len(remaining)} rollup rows still drifted after rebuild")
+            return 1
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
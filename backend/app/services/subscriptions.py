@@ -1,10 +1,65 @@
+import base64
+import csv
+import io
+import json
 from datetime import date, timedelta
-from typing import Optional, List
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, List, Sequence, Tuple
 
+from pydantic import ValidationError
+from sqlalchemy import Date, Float, Integer, Numeric, String, and_, case, cast, delete, func, insert, literal, literal_column, or_, select, update
 from sqlalchemy.orm import Session
 
-from app.models import Subscription
-from app.schemas import SubscriptionCreate, SubscriptionUpdate
+from app.models import Subscription, UserSpendingRollup
+from app.schemas import SubscriptionCreate, SubscriptionRead, SubscriptionUpdate
+from app.services.revisions import bump_data_revision
+from app.services.rollups import (
+    apply_contributions,
+    apply_rollup_difference,
+    apply_subscription_delta,
+    compute_rollups,
+    get_rollup_rows,
+    subscription_contribution,
+)
+
+
+# Multiplier from a price per billing cycle to its monthly equivalent.
+# Unknown cycles are treated as monthly.
+MONTHLY_FACTORS = {"monthly": 1.0, "yearly": 1 / 12, "weekly": 4.345}
+
+# Dimensions /subscriptions/breakdown can group by
+BREAKDOWN_DIMENSIONS = ("category", "currency", "billing_cycle")
+
+# Keyset orderings supported by list_subscriptions_page ("-" means descending)
+LIST_SORTS = ("id", "-id", "next_billing_date", "-next_billing_date")
+# Columns that can be requested with fields=
+LIST_FIELDS = tuple(SubscriptionRead.model_fields)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Maximum number of rows accepted by one POST /subscriptions/bulk request
+BULK_MAX_ROWS = 10000
+# Columns a bulk update may set to null
+BULK_NULLABLE_FIELDS = ("next_billing_date", "category")
+
+
+def compute_reminder_due_date(
+    next_billing_date: Optional[date], reminder_days_before: Optional[int]
+) -> Optional[date]:
+    """Return the day a reminder is due, or None if there is no billing date."""
+    if next_billing_date is None or reminder_days_before is None:
+        return None
+    return next_billing_date - timedelta(days=reminder_days_before)
+
+
+def _read_column(field: str):
+    """
+    Subscription column for a SubscriptionRead field, as the API sends it:
+    Numeric columns (price) are cast to float in SQL, matching the schema.
+    """
+    column = getattr(Subscription, field)
+    if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+        return cast(column, Float).label(field)
+    return column
 
 
 def get_subscriptions_for_user(db: Session, user_id: int) -> list[Subscription]:
@@ -12,15 +67,152 @@ def get_subscriptions_for_user(db: Session, user_id: int) -> list[Subscription]:
     return db.query(Subscription).filter(Subscription.user_id == user_id).all()
 
 
+def encode_cursor(sort: str, row) -> str:
+    """Opaque cursor pointing just after `row` in the given ordering."""
+    if sort.lstrip("-") == "id":
+        key = [row.id]
+    else:
+        key = [row.next_billing_date.isoformat() if row.next_billing_date else None, row.id]
+    payload = json.dumps([sort, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Decode a cursor made by encode_cursor for the same ordering; raise ValueError if invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, *key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if cursor_sort != sort:
+            raise ValueError
+        if sort.lstrip("-") == "id":
+            (last_id,) = key
+            return [int(last_id)]
+        last_date, last_id = key
+        return [date.fromisoformat(last_date) if last_date else None, int(last_id)]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_filter(sort: str, key: list):
+    """Rows strictly after the cursor key in the given ordering."""
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "id":
+        (last_id,) = key
+        return Subscription.id < last_id if descending else Subscription.id > last_id
+
+    # next_billing_date ordering: dated rows first (asc or desc), then undated rows, ties by id
+    last_date, last_id = key
+    billing = Subscription.next_billing_date
+    after_id = Subscription.id < last_id if descending else Subscription.id > last_id
+    if last_date is None:
+        return and_(billing.is_(None), after_id)
+    return or_(
+        billing < last_date if descending else billing > last_date,
+        and_(billing == last_date, after_id),
+        billing.is_(None),
+    )
+
+
+def list_subscriptions_page(
+    db: Session,
+    user_id: int,
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    fields: Optional[Sequence[str]] = None,
+    category: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    billing_cycle: Optional[str] = None,
+    as_tuples: bool = False,
+) -> Tuple[list, Optional[str]]:
+    """
+    List a user's subscriptions with optional filters, keyset pagination and
+    column projection.
+
+    Without `limit` and `cursor` every matching row is returned. Otherwise
+    at most `limit` rows (DEFAULT_PAGE_SIZE if only a cursor is given)
+    following `cursor` are returned, together with the cursor for the next
+    page, or None on the last page.
+
+    With `fields`, only those columns are selected and rows are returned as
+    dicts. With `as_tuples`, all LIST_FIELDS columns are selected and rows
+    are returned as tuples in that order, without building ORM objects.
+    Otherwise Subscription objects are returned.
+
+    Raises ValueError for an unknown sort, field or an invalid cursor.
+    """
+    if sort not in LIST_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(LIST_SORTS)}")
+    if fields is not None:
+        unknown = [field for field in fields if field not in LIST_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else "fields must not be empty")
+
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "id":
+        order_by = [Subscription.id.desc() if descending else Subscription.id]
+    else:
+        billing = Subscription.next_billing_date
+        order_by = [
+            billing.is_(None),
+            billing.desc() if descending else billing,
+            Subscription.id.desc() if descending else Subscription.id,
+        ]
+
+    if fields is not None:
+        # The sort key columns are always selected so the next cursor can be built
+        selected = list(dict.fromkeys([*fields, "id", "next_billing_date"]))
+        query = db.query(*(_read_column(field) for field in selected))
+    elif as_tuples:
+        # LIST_FIELDS already contains the sort key columns
+        query = db.query(*(_read_column(field) for field in LIST_FIELDS))
+    else:
+        query = db.query(Subscription)
+
+    query = query.filter(Subscription.user_id == user_id)
+    if category is not None:
+        query = query.filter(Subscription.category == category)
+    if is_active is not None:
+        query = query.filter(Subscription.is_active == is_active)
+    if billing_cycle is not None:
+        query = query.filter(func.lower(Subscription.billing_cycle) == billing_cycle.lower())
+    if cursor is not None:
+        query = query.filter(_keyset_filter(sort, decode_cursor(cursor, sort)))
+    query = query.order_by(*order_by)
+
+    next_cursor = None
+    if limit is None and cursor is None:
+        rows = query.all()
+    else:
+        limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        # One extra row tells us whether there is a next page
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1])
+
+    if fields is not None:
+        rows = [{field: getattr(row, field) for field in fields} for row in rows]
+    return rows, next_cursor
+
+
 def get_subscription(
-    db: Session, user_id: int, subscription_id: int
+    db: Session, user_id: int, subscription_id: int, for_update: bool = False
 ) -> Optional[Subscription]:
-    """Get a specific subscription by ID, ensuring it belongs to the user."""
-    return (
-        db.query(Subscription)
-        .filter(Subscription.id == subscription_id, Subscription.user_id == user_id)
-        .first()
+    """
+    Get a specific subscription by ID, ensuring it belongs to the user.
+
+    With `for_update` the row is locked until the transaction ends and
+    reloaded, so update/delete compute their rollup deltas from the values
+    they actually replace, not from a concurrent writer's stale copy.
+    """
+    query = db.query(Subscription).filter(
+        Subscription.id == subscription_id, Subscription.user_id == user_id
     )
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    return query.first()
 
 
 def create_subscription(
@@ -41,42 +233,272 @@ def create_subscription(
         is_active=subscription_in.is_active,
         reminder_enabled=subscription_in.reminder_enabled,
         reminder_days_before=reminder_days,
+        reminder_due_date=compute_reminder_due_date(
+            subscription_in.next_billing_date, reminder_days
+        ),
     )
     db.add(subscription)
+    apply_subscription_delta(db, None, subscription_contribution(subscription))
+    bump_data_revision(db, user_id)
     db.commit()
     db.refresh(subscription)
     return subscription
 
 
+def parse_bulk_csv(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse CSV with a header row of SubscriptionCreate field names into row
+    dicts. Empty cells are dropped so the schema defaults apply.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in reader
+    ]
+
+
+def validate_bulk_rows(
+    rows: List[Any],
+) -> Tuple[List[Tuple[int, SubscriptionCreate]], List[Dict[str, Any]]]:
+    """
+    Validate raw rows against SubscriptionCreate in one pass.
+
+    Returns ([(index, subscription_in), ...], [{"index", "errors"}, ...]),
+    where index is the 0-based position of the row in the input.
+    """
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, SubscriptionCreate.model_validate(row)))
+        except ValidationError as e:
+            errors.append({
+                "index": index,
+                "errors": [
+                    {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                    for error in e.errors()
+                ],
+            })
+    return valid, errors
+
+
+def bulk_create_subscriptions(
+    db: Session,
+    user_id: int,
+    subscriptions_in: List[SubscriptionCreate],
+    default_reminder_days_before: int = 3,
+) -> List[int]:
+    """
+    Create many subscriptions for a user in one transaction.
+
+    Rows go out as multi-row INSERT ... RETURNING statements (batched by
+    SQLAlchemy's insertmanyvalues), and the spending rollup gets one delta
+    per (billing_cycle, category, currency) instead of one per row.
+    Returns the new ids in input order.
+    """
+    if not subscriptions_in:
+        return []
+
+    values = []
+    for subscription_in in subscriptions_in:
+        reminder_days = subscription_in.reminder_days_before
+        if reminder_days is None:
+            reminder_days = default_reminder_days_before
+        values.append({
+            "user_id": user_id,
+            "name": subscription_in.name,
+            "price": subscription_in.price,
+            "currency": subscription_in.currency,
+            "billing_cycle": subscription_in.billing_cycle,
+            "next_billing_date": subscription_in.next_billing_date,
+            "category": subscription_in.category,
+            "is_active": subscription_in.is_active,
+            "reminder_enabled": subscription_in.reminder_enabled,
+            "reminder_days_before": reminder_days,
+            "reminder_due_date": compute_reminder_due_date(
+                subscription_in.next_billing_date, reminder_days
+            ),
+        })
+
+    ids = list(
+        db.execute(
+            insert(Subscription).returning(Subscription.id, sort_by_parameter_order=True),
+            values,
+        ).scalars()
+    )
+    apply_contributions(db, (subscription_contribution(SimpleNamespace(**row)) for row in values))
+    bump_data_revision(db, user_id)
+    db.commit()
+    return ids
+
+
 def update_subscription(
     db: Session, db_obj: Subscription, subscription_in: SubscriptionUpdate
 ) -> Subscription:
-    """Update an existing subscription with partial data."""
+    """
+    Update an existing subscription with partial data. Load `db_obj` with
+    get_subscription(..., for_update=True) in the same transaction.
+    """
+    old_contribution = subscription_contribution(db_obj)
     update_data = subscription_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    db_obj.reminder_due_date = compute_reminder_due_date(
+        db_obj.next_billing_date, db_obj.reminder_days_before
+    )
+    apply_subscription_delta(db, old_contribution, subscription_contribution(db_obj))
+    bump_data_revision(db, db_obj.user_id)
     db.commit()
     db.refresh(db_obj)
     return db_obj
 
 
 def delete_subscription(db: Session, db_obj: Subscription) -> None:
-    """Delete a subscription."""
+    """Delete a subscription loaded with get_subscription(..., for_update=True)."""
+    apply_subscription_delta(db, subscription_contribution(db_obj), None)
     db.delete(db_obj)
+    bump_data_revision(db, db_obj.user_id)
     db.commit()
 
 
-def get_upcoming_renewals(db: Session, user_id: int, within_days: int = 7) -> List[Subscription]:
+def reminder_due_date_expression(db: Session, next_billing_date, reminder_days_before):
+    """
+    SQL expression for next_billing_date - reminder_days_before days, where
+    either argument may be a column or a Python value. Used by set-based
+    updates, which can't run compute_reminder_due_date per row.
+    """
+    if next_billing_date is None:
+        return None
+    if isinstance(next_billing_date, date):
+        next_billing_date = literal(next_billing_date, Date)
+    if isinstance(reminder_days_before, int):
+        reminder_days_before = literal(reminder_days_before, Integer)
+
+    if db.get_bind().dialect.name == "sqlite":
+        modifier = literal("-", String) + cast(reminder_days_before, String) + literal(" days", String)
+        return func.date(next_billing_date, modifier)
+    return next_billing_date - reminder_days_before
+
+
+def _select_for_bulk(
+    db: Session, user_id: int, ids: Optional[List[int]], filters: Optional[dict]
+) -> List[int]:
+    """
+    Lock and return the ids of the user's subscriptions matching `ids`
+    and/or `filters` (category, is_active, billing_cycle).
+    """
+    criteria = [Subscription.user_id == user_id]
+    if ids is not None:
+        criteria.append(Subscription.id.in_(ids))
+    for field, value in (filters or {}).items():
+        if value is None:
+            continue
+        if field == "billing_cycle":
+            criteria.append(func.lower(Subscription.billing_cycle) == value.lower())
+        else:
+            criteria.append(getattr(Subscription, field) == value)
+
+    return list(
+        db.execute(
+            select(Subscription.id).where(*criteria).order_by(Subscription.id).with_for_update()
+        ).scalars()
+    )
+
+
+def bulk_update_subscriptions(
+    db: Session,
+    user_id: int,
+    update_data: dict,
+    ids: Optional[List[int]] = None,
+    filters: Optional[dict] = None,
+) -> List[int]:
+    """
+    Apply the same partial update to many of a user's subscriptions with
+    one UPDATE ... WHERE user_id = :uid AND id IN (...).
+
+    reminder_due_date is recomputed in SQL when next_billing_date or
+    reminder_days_before change, and the spending rollup is moved by the
+    difference of the affected rows' totals before and after. Returns the
+    affected ids.
+
+    Raises ValueError if `update_data` sets nothing.
+    """
+    values = {
+        field: value
+        for field, value in update_data.items()
+        if value is not None or field in BULK_NULLABLE_FIELDS
+    }
+    if not values:
+        raise ValueError("update must set at least one field")
+
+    selected = _select_for_bulk(db, user_id, ids, filters)
+    if not selected:
+        db.commit()
+        return []
+
+    if "next_billing_date" in values or "reminder_days_before" in values:
+        values["reminder_due_date"] = reminder_due_date_expression(
+            db,
+            values.get("next_billing_date", Subscription.next_billing_date),
+            values.get("reminder_days_before", Subscription.reminder_days_before),
+        )
+
+    before = compute_rollups(db, subscription_ids=selected)
+    db.execute(
+        update(Subscription)
+        .where(Subscription.user_id == user_id, Subscription.id.in_(selected))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    apply_rollup_difference(db, before, compute_rollups(db, subscription_ids=selected))
+    bump_data_revision(db, user_id)
+    db.commit()
+    return selected
+
+
+def bulk_delete_subscriptions(
+    db: Session,
+    user_id: int,
+    ids: Optional[List[int]] = None,
+    filters: Optional[dict] = None,
+) -> List[int]:
+    """
+    Delete many of a user's subscriptions with one
+    DELETE ... WHERE user_id = :uid AND id IN (...), removing their totals
+    from the spending rollup. Returns the deleted ids.
+    """
+    selected = _select_for_bulk(db, user_id, ids, filters)
+    if selected:
+        apply_rollup_difference(db, compute_rollups(db, subscription_ids=selected), {})
+        db.execute(
+            delete(Subscription)
+            .where(Subscription.user_id == user_id, Subscription.id.in_(selected))
+            .execution_options(synchronize_session=False)
+        )
+        bump_data_revision(db, user_id)
+    db.commit()
+    return selected
+
+
+def get_upcoming_renewals(
+    db: Session, user_id: int, within_days: int = 7, as_tuples: bool = False
+) -> list:
     """
     Return active subscriptions for the given user that have a next_billing_date
     within the next `within_days` days.
     Only include subscriptions where reminder_enabled is True.
+
+    With `as_tuples`, rows are LIST_FIELDS tuples instead of Subscription objects.
     """
     today = date.today()
     cutoff_date = today + timedelta(days=within_days)
-    
+
+    if as_tuples:
+        query = db.query(*(_read_column(field) for field in LIST_FIELDS))
+    else:
+        query = db.query(Subscription)
     return (
-        db.query(Subscription)
+        query
         .filter(
             Subscription.user_id == user_id,
             Subscription.is_active == True,
@@ -89,3 +511,78 @@ def get_upcoming_renewals(db: Session, user_id: int, within_days: int = 7) -> Li
         .all()
     )
 
+
+def get_summary_for_user(db: Session, user_id: int) -> dict:
+    """
+    Summary statistics for a user's active subscriptions.
+
+    Reads the user's user_spending_rollup rows (a primary-key lookup) and
+    applies the monthly normalization to them.
+    """
+    total_active = 0
+    total_monthly_cost = 0.0
+    by_billing_cycle = {"monthly": 0.0, "yearly": 0.0, "weekly": 0.0}
+
+    for row in get_rollup_rows(db, user_id):
+        total = float(row.total_price)
+        # Default to monthly if unknown cycle
+        key = row.billing_cycle if row.billing_cycle in MONTHLY_FACTORS else "monthly"
+        total_active += row.subscription_count
+        by_billing_cycle[key] += total
+        total_monthly_cost += total * MONTHLY_FACTORS[key]
+
+    return {
+        "total_active": total_active,
+        "total_monthly_cost": round(total_monthly_cost, 2),
+        "by_billing_cycle": {
+            "monthly": round(by_billing_cycle["monthly"], 2),
+            "yearly": round(by_billing_cycle["yearly"], 2),
+            "weekly": round(by_billing_cycle["weekly"], 2),
+        },
+    }
+
+
+def get_breakdown_for_user(db: Session, user_id: int, by: str = "category") -> List[dict]:
+    """
+    Monthly-normalized spending of a user's active subscriptions grouped by
+    category, currency or billing_cycle, largest first.
+
+    One GROUP BY over the user's user_spending_rollup rows; the monthly
+    factor is applied in SQL with a CASE on the billing cycle. Missing or
+    blank categories are reported as "Uncategorized".
+    """
+    if by not in BREAKDOWN_DIMENSIONS:
+        raise ValueError(f"Unsupported breakdown dimension: {by}")
+
+    if by == "category":
+        key = func.coalesce(func.nullif(func.trim(UserSpendingRollup.category), ""), "Uncategorized")
+    else:
+        key = getattr(UserSpendingRollup, by)
+
+    monthly_factor = case(
+        *((UserSpendingRollup.billing_cycle == cycle, factor) for cycle, factor in MONTHLY_FACTORS.items()),
+        else_=1.0,
+    )
+    monthly_cost = func.sum(cast(UserSpendingRollup.total_price, Float) * monthly_factor)
+
+    rows = (
+        db.query(
+            key.label("key"),
+            func.sum(UserSpendingRollup.subscription_count).label("count"),
+            monthly_cost.label("monthly_cost"),
+        )
+        .filter(UserSpendingRollup.user_id == user_id, UserSpendingRollup.subscription_count > 0)
+        # Refer to the labels so the parameterized expressions are not repeated
+        .group_by(literal_column("key"))
+        .order_by(literal_column("monthly_cost").desc())
+        .all()
+    )
+
+    return [
+        {
+            "key": row.key,
+            "count": int(row.count),
+            "monthly_cost": round(float(row.monthly_cost), 2),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark login password verification latency per bcrypt cost.
+
+For each cost, verifies a password through the same PasswordHashPool the
+API uses, with `--concurrency` logins in flight at a time, and prints
+p50/p99/max latency (queue wait + hashing) and throughput. Use it on
+production-like hardware to pick BCRYPT_ROUNDS and the pool settings.
+
+Usage:
+    python scripts/benchmark_password_hashing.py
+    python scripts/benchmark_password_hashing.py --costs 10 11 12 --iterations 200 --concurrency 8
+    python scripts/benchmark_password_hashing.py --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from passlib.context import CryptContext
+
+from app.core.security import PASSWORD_HASH_WORKERS, PasswordHashPool, verify_password
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_cost(cost: int, iterations: int, concurrency: int, workers: int) -> dict:
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost).hash(PASSWORD)
+    # Large enough queue that nothing is shed; this measures latency, not rejection
+    pool = PasswordHashPool(workers=workers, max_pending=max(concurrency, 1))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def login() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            assert await pool.run(verify_password, PASSWORD, hashed)
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        # Warm up the pool threads
+        await pool.run(verify_password, PASSWORD, hashed)
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(iterations)))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    latencies.sort()
+    return {
+        "cost": cost,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "max": latencies[-1] * 1000,
+        "throughput": iterations / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--costs", type=int, nargs="+", default=[10, 11, 12, 13], help="bcrypt costs to test")
+    parser.add_argument("--iterations", type=int, default=100, help="logins per cost")
+    parser.add_argument("--concurrency", type=int, default=1, help="logins in flight at once")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS, help="hashing threads")
+    args = parser.parse_args()
+
+    print(
+        f"bcrypt login latency: {args.iterations} logins per cost, concurrency {args.concurrency}, "
+        f"{args.workers} workers, {os.cpu_count()} CPUs"
+    )
+    print(f"{'cost':>4}  {'p50 ms':>9}  {'p99 ms':>9}  {'max ms':>9}  {'logins/s':>9}")
+    for cost in args.costs:
+        result = asyncio.run(run_cost(cost, args.iterations, args.concurrency, args.workers))
+        print(
+            f"{result['cost']:>4}  {result['p50']:>9.1f}  {result['p99']:>9.1f}  "
+            f"{result['max']:>9.1f}  {result['throughput']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Shared fixtures: the app on a scratch SQLite database, a client, and a
+registered user's auth headers.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Configure the app before it is imported: the engine is built at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("INTERNAL_API_KEY", "test-internal-key")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.models  # noqa: E402,F401
+from app.core.cache import close_response_cache  # noqa: E402
+from app.core.principal import get_principal_cache  # noqa: E402
+from app.db.session import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # Ids and revisions restart with the database; drop what earlier tests cached
+    get_principal_cache().clear()
+    asyncio.run(close_response_cache())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def credentials():
+    return {"email": "owner@example.com", "password": "correct-horse-battery"}
+
+
+@pytest.fixture
+def auth_headers(client, credentials):
+    response = client.post("/auth/register", json=credentials)
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def internal_headers():
+    return {"X-Internal-API-Key": os.environ["INTERNAL_API_KEY"]}
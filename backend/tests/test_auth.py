@@ -0,0 +1,50 @@
+from app.core.security import create_access_token
+
+
+def _user_id(client, headers):
+    return client.get("/auth/me", headers=headers).json()["id"]
+
+
+def test_revoke_tokens_rejects_existing_tokens(client, credentials, auth_headers, internal_headers):
+    user_id = _user_id(client, auth_headers)
+    # Warm the principal cache with the old token
+    assert client.get("/subscriptions", headers=auth_headers).status_code == 200
+
+    response = client.post(f"/internal/users/{user_id}/revoke-tokens", headers=internal_headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"user_id": user_id, "is_active": True, "token_version": 1}
+
+    assert client.get("/subscriptions", headers=auth_headers).status_code == 401
+    assert client.get("/auth/me", headers=auth_headers).status_code == 401
+
+    new_token = client.post("/auth/login", json=credentials).json()["access_token"]
+    assert client.get("/subscriptions", headers={"Authorization": f"Bearer {new_token}"}).status_code == 200
+
+
+def test_revoke_tokens_with_deactivate(client, credentials, auth_headers, internal_headers):
+    user_id = _user_id(client, auth_headers)
+    response = client.post(
+        f"/internal/users/{user_id}/revoke-tokens", params={"deactivate": "true"}, headers=internal_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["is_active"] is False
+
+    assert client.get("/subscriptions", headers=auth_headers).status_code == 401
+    new_token = client.post("/auth/login", json=credentials).json()["access_token"]
+    assert client.get("/subscriptions", headers={"Authorization": f"Bearer {new_token}"}).status_code == 401
+
+
+def test_revoke_tokens_covers_legacy_tokens(client, credentials, auth_headers, internal_headers):
+    # Issued before tokens carried uid/ver claims
+    legacy_headers = {"Authorization": f"Bearer {create_access_token(subject=credentials['email'])}"}
+    assert client.get("/subscriptions", headers=legacy_headers).status_code == 200
+
+    user_id = _user_id(client, auth_headers)
+    client.post(f"/internal/users/{user_id}/revoke-tokens", headers=internal_headers)
+
+    assert client.get("/subscriptions", headers=legacy_headers).status_code == 401
+    assert client.get("/auth/me", headers=legacy_headers).status_code == 401
+
+
+def test_revoke_tokens_unknown_user(client, internal_headers):
+    assert client.post("/internal/users/999/revoke-tokens", headers=internal_headers).status_code == 404
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def subscription_ids(client, auth_headers):
+    ids = []
+    for i, category in enumerate(["Streaming", "Software", None]):
+        response = client.post(
+            "/subscriptions",
+            headers=auth_headers,
+            json={
+                "name": f"Subscription {i}",
+                "price": 9.99,
+                "billing_cycle": "monthly",
+                "category": category,
+                "next_billing_date": str(date.today() + timedelta(days=10 + i)),
+            },
+        )
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+def _remaining(client, auth_headers):
+    return [subscription["id"] for subscription in client.get("/subscriptions", headers=auth_headers).json()]
+
+
+@pytest.mark.parametrize("body", [{}, {"filter": {}}, {"filter": {"category": None, "is_active": None}}])
+def test_bulk_delete_rejects_empty_selection(client, auth_headers, subscription_ids, body):
+    response = client.request("DELETE", "/subscriptions/bulk", headers=auth_headers, json=body)
+    assert response.status_code == 400
+    assert _remaining(client, auth_headers) == subscription_ids
+
+
+@pytest.mark.parametrize("body", [{}, {"filter": {}}, {"filter": {"billing_cycle": None}}])
+def test_bulk_update_rejects_empty_selection(client, auth_headers, subscription_ids, body):
+    response = client.patch(
+        "/subscriptions/bulk", headers=auth_headers, json={**body, "update": {"is_active": False}}
+    )
+    assert response.status_code == 400
+    subscriptions = client.get("/subscriptions", headers=auth_headers).json()
+    assert all(subscription["is_active"] for subscription in subscriptions)
+
+
+def test_bulk_delete_by_filter(client, auth_headers, subscription_ids):
+    response = client.request(
+        "DELETE", "/subscriptions/bulk", headers=auth_headers, json={"filter": {"category": "Streaming"}}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {"ids": [subscription_ids[0]]}
+    assert _remaining(client, auth_headers) == subscription_ids[1:]
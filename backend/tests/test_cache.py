@@ -0,0 +1,43 @@
+import asyncio
+
+
+from app.core.cache import MemoryCacheBackend, ResponseCache
+
+
+def test_memory_backend_ttl_and_lru():
+    backend = MemoryCacheBackend(max_size=2)
+
+    async def scenario():
+        await backend.set("a", b"1", 60)
+        await backend.set("b", b"2", 60)
+        assert await backend.get("a") == b"1"
+        await backend.set("c", b"3", -1)  # evicts "b", the least recently used; already expired
+        return [await backend.get(key) for key in "abc"]
+
+    assert asyncio.run(scenario()) == [b"1", None, None]
+    stats = backend.stats()
+    assert (stats['evictions'], stats['expirations']) == (1, 1)
+
+
+def test_cache_hit_is_not_served_after_write_by_another_process(client, auth_headers, monkeypatch):
+    # One shared cache stands in for another replica's: it is never told about
+    # the write below, yet must not serve the pre-write body
+    shared = ResponseCache(MemoryCacheBackend())
+    monkeypatch.setattr("app.api.routes.subscriptions.get_response_cache", lambda: shared)
+
+    first = client.get("/subscriptions", headers=auth_headers)
+    assert first.json() == []
+    assert client.get("/subscriptions", headers=auth_headers).json() == []
+    assert shared.stats()['hits'] == 1
+
+    response = client.post(
+        "/subscriptions",
+        headers=auth_headers,
+        json={"name": "Music", "price": 9.99, "billing_cycle": "monthly", "next_billing_date": "2030-01-01"},
+    )
+    assert response.status_code == 201, response.text
+
+    second = client.get("/subscriptions", headers={**auth_headers, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert [subscription["name"] for subscription in second.json()] == ["Music"]
+    assert second.headers["ETag"] != first.headers["ETag"]
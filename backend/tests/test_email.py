@@ -0,0 +1,104 @@
+import asyncio
+import smtplib
+import socket
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.core.email import (  # noqa: E402
+    SMTPConnectionPool,
+    _build_message,
+    close_smtp_pool,
+    get_smtp_pool,
+    send_email,
+    send_email_async,
+)
+
+REFUSED = "refused@example.com"
+
+
+class RecordingHandler:
+    """Accepts every message except those to REFUSED."""
+
+    def __init__(self):
+        self.delivered = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUSED:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield controller, handler
+    finally:
+        controller.stop()
+
+
+def _message(to_email):
+    return _build_message("noreply@example.com", to_email, "Subject", "Body")
+
+
+def test_pool_keeps_session_after_recipient_refusal(smtp_server):
+    controller, handler = smtp_server
+    pool = SMTPConnectionPool(controller.hostname, controller.port, max_connections=1)
+    try:
+        pool.send_message(_message("first@example.com"))
+        session = pool._idle[0]
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send_message(_message(REFUSED))
+        assert pool._idle == [session]
+
+        pool.send_message(_message("second@example.com"))
+        assert pool._idle == [session]
+    finally:
+        pool.close()
+    assert handler.delivered == ["first@example.com", "second@example.com"]
+
+
+def test_unauthenticated_server_from_env(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    monkeypatch.setenv("SMTP_HOST", controller.hostname)
+    monkeypatch.setenv("SMTP_PORT", str(controller.port))
+    monkeypatch.delenv("SMTP_USERNAME", raising=False)
+    monkeypatch.delenv("SMTP_PASSWORD", raising=False)
+
+    asyncio.run(send_email_async("user@example.com", "Subject", "Body"))
+    assert handler.delivered == ["user@example.com"]
+
+
+def test_send_email_reuses_pooled_session(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    monkeypatch.setenv("SMTP_HOST", controller.hostname)
+    monkeypatch.setenv("SMTP_PORT", str(controller.port))
+    close_smtp_pool()
+    try:
+        send_email("first@example.com", "Subject", "Body")
+        pool = get_smtp_pool()
+        session = pool._idle[0]
+
+        # Permanent refusals are raised without retrying, and keep the session
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            send_email(REFUSED, "Subject", "Body")
+
+        send_email("second@example.com", "Subject", "Body")
+        assert get_smtp_pool() is pool
+        assert pool._idle == [session]
+    finally:
+        close_smtp_pool()
+    assert handler.delivered == ["first@example.com", "second@example.com"]
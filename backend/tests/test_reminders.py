@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from app.db.session import SessionLocal
+from app.models import EmailOutbox
+from app.services.outbox import enqueue_emails
+from app.services.reminders import enqueue_renewal_reminders, process_renewal_reminders
+
+
+def _register(client, email):
+    credentials = {"email": email, "password": "correct-horse-battery"}
+    client.post("/auth/register", json=credentials)
+    token = client.post("/auth/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_sharded_run_delivers_only_its_shards_reminders(client, monkeypatch):
+    monkeypatch.delenv("SMTP_HOST", raising=False)
+    for email in ("one@example.com", "two@example.com"):
+        response = client.post(
+            "/subscriptions",
+            headers=_register(client, email),
+            json={
+                "name": "Music",
+                "price": 9.99,
+                "billing_cycle": "monthly",
+                "next_billing_date": str(date.today() + timedelta(days=3)),
+                "reminder_days_before": 3,
+            },
+        )
+        assert response.status_code == 201, response.text
+
+    db = SessionLocal()
+    try:
+        # Both shards' reminders (users 1 and 2) plus an unrelated email are pending
+        assert enqueue_renewal_reminders(db)['reminders_sent'] == 2
+        enqueue_emails(db, [{
+            "kind": "other", "dedupe_key": "other:1", "user_id": 2,
+            "to_email": "two@example.com", "subject": "Hi", "body": "Hi",
+        }])
+        db.commit()
+    finally:
+        db.close()
+
+    stats = process_renewal_reminders(shard_index=0, shard_count=2)
+    assert stats['reminders_queued'] == 0  # already queued above
+    assert stats['reminders_sent'] == 1
+
+    db = SessionLocal()
+    try:
+        statuses = {(row.kind, row.user_id): row.status for row in db.query(EmailOutbox)}
+    finally:
+        db.close()
+    assert statuses == {
+        ("renewal_reminder", 1): "pending",
+        ("renewal_reminder", 2): "sent",
+        ("other", 2): "pending",
+    }
@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+from app.core.security import PasswordHashPool
+
+
+def test_cancelled_call_stays_pending_until_job_finishes():
+    pool = PasswordHashPool(workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        task = asyncio.create_task(pool.run(job))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # The job is still running in the pool, so it still counts
+        assert pool.stats()['pending'] == 1
+
+    try:
+        asyncio.run(scenario())
+        release.set()
+        pool._executor.shutdown(wait=True)
+        assert pool.stats()['pending'] == 0
+    finally:
+        release.set()
+        pool.close()
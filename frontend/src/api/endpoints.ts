@@ -8,6 +8,9 @@ import type {
   SubscriptionCreate,
   SubscriptionUpdate,
   SubscriptionSummary,
+  SubscriptionForecast,
+  SubscriptionBreakdownItem,
+  BreakdownDimension,
 } from './types';
 
 // ==================== Auth Endpoints ====================
@@ -57,6 +60,28 @@ export const subscriptions = {
     return response.data;
   },
 
+  /**
+   * Get the per-month spending forecast for the next `months` months
+   */
+  getForecast: async (months: number = 12): Promise<SubscriptionForecast> => {
+    const response = await apiClient.get<SubscriptionForecast>(
+      `/subscriptions/forecast?months=${months}`
+    );
+    return response.data;
+  },
+
+  /**
+   * Get monthly-normalized spending grouped by category, currency or billing cycle
+   */
+  getBreakdown: async (
+    by: BreakdownDimension = 'category'
+  ): Promise<SubscriptionBreakdownItem[]> => {
+    const response = await apiClient.get<SubscriptionBreakdownItem[]>(
+      `/subscriptions/breakdown?by=${by}`
+    );
+    return response.data;
+  },
+
   /**
    * Get a specific subscription by ID
    */
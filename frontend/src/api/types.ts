@@ -80,3 +80,18 @@ export interface SubscriptionSummary {
   };
 }
 
+export interface SubscriptionForecast {
+  /** First forecast month, e.g. "2025-12" */
+  start_month: string;
+  /** Actual charges per month, one entry per forecast month */
+  totals: number[];
+}
+
+export type BreakdownDimension = 'category' | 'currency' | 'billing_cycle';
+
+export interface SubscriptionBreakdownItem {
+  key: string;
+  count: number;
+  /** Normalized monthly cost for this group */
+  monthly_cost: number;
+}
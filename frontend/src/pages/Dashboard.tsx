@@ -1,8 +1,9 @@
-import { useEffect, useState, useMemo } from 'react';
+import { useEffect, useState } from 'react';
 import { useAuth } from '../hooks/useAuth';
 import { subscriptions } from '../api/endpoints';
 import type { Subscription, SubscriptionSummary, SubscriptionCreate } from '../api/types';
-import { buildSpendingForecast, buildCategoryBreakdown } from '../utils/chartData';
+import { forecastPointsFromSeries, categoryBreakdownFromItems } from '../utils/chartData';
+import type { ForecastPoint, CategoryBreakdownItem } from '../utils/chartData';
 import Layout from '../components/Layout';
 import Card from '../components/ui/Card';
 import Button from '../components/ui/Button';
@@ -15,6 +16,8 @@ export default function Dashboard() {
   const { user } = useAuth();
   const [subscriptionList, setSubscriptionList] = useState<Subscription[]>([]);
   const [summary, setSummary] = useState<SubscriptionSummary | null>(null);
+  const [forecastData, setForecastData] = useState<ForecastPoint[]>([]);
+  const [categoryData, setCategoryData] = useState<CategoryBreakdownItem[]>([]);
   const [upcomingRenewals, setUpcomingRenewals] = useState<Subscription[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [isLoadingUpcoming, setIsLoadingUpcoming] = useState(false);
@@ -29,14 +32,18 @@ export default function Dashboard() {
       const token = localStorage.getItem('access_token');
       console.log('[Dashboard] Starting load, token:', token ? 'exists' : 'missing');
       
-      const [subscriptionsData, summaryData] = await Promise.all([
+      const [subscriptionsData, summaryData, forecast, breakdown] = await Promise.all([
         subscriptions.list(),
         subscriptions.getSummary(),
+        subscriptions.getForecast(12),
+        subscriptions.getBreakdown('category'),
       ]);
       
       console.log('[Dashboard] Data loaded successfully');
       setSubscriptionList(subscriptionsData);
       setSummary(summaryData);
+      setForecastData(forecastPointsFromSeries(forecast));
+      setCategoryData(categoryBreakdownFromItems(breakdown));
     } catch (err: any) {
       console.error('[Dashboard] Load error:', err);
       const errorMessage = err.response?.data?.detail || err.message || 'Failed to load subscriptions';
@@ -144,17 +151,6 @@ export default function Dashboard() {
     return diffDays;
   };
 
-  // Compute chart data using useMemo
-  const forecastData = useMemo(
-    () => buildSpendingForecast(subscriptionList),
-    [subscriptionList]
-  );
-
-  const categoryData = useMemo(
-    () => buildCategoryBreakdown(subscriptionList),
-    [subscriptionList]
-  );
-
   console.log('[Dashboard] Rendering with state:', { isLoading, error, hasUser: !!user });
 
   return (
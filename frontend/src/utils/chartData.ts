@@ -1,4 +1,8 @@
-import type { Subscription } from '../api/types';
+import type {
+  Subscription,
+  SubscriptionForecast,
+  SubscriptionBreakdownItem,
+} from '../api/types';
 
 export type BillingCycle = 'monthly' | 'yearly' | 'weekly';
 
@@ -196,6 +200,47 @@ export function buildSpendingForecast(
   return result;
 }
 
+/**
+ * Converts the backend forecast series (`GET /subscriptions/forecast`) into
+ * ForecastPoint objects for the chart.
+ * 
+ * @param forecast - Start month and per-month totals from the API
+ * @returns Array of ForecastPoint objects, one per month
+ */
+export function forecastPointsFromSeries(
+  forecast: SubscriptionForecast
+): ForecastPoint[] {
+  const [year, month] = forecast.start_month.split('-').map(Number);
+  
+  return forecast.totals.map((total, i) => {
+    const monthDate = new Date(year, month - 1 + i, 1);
+    return {
+      monthKey: `${monthDate.getFullYear()}-${String(monthDate.getMonth() + 1).padStart(2, '0')}`,
+      label: monthDate.toLocaleDateString('en-US', {
+        month: 'short',
+        year: 'numeric',
+      }),
+      totalMonthlyCost: total,
+    };
+  });
+}
+
+/**
+ * Converts backend breakdown rows (`GET /subscriptions/breakdown?by=category`)
+ * into CategoryBreakdownItem objects for the chart.
+ * 
+ * @param items - Breakdown rows from the API, already sorted by monthly cost
+ * @returns Array of CategoryBreakdownItem objects
+ */
+export function categoryBreakdownFromItems(
+  items: SubscriptionBreakdownItem[]
+): CategoryBreakdownItem[] {
+  return items.map((item) => ({
+    category: item.key,
+    monthlyCost: item.monthly_cost,
+  }));
+}
+
 /**
  * Builds a category breakdown of spending from active subscriptions.
  * 